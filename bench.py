@@ -0,0 +1,154 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from engine.batch_evaluation import evaluate_planes
+from engine.evaluation import evaluate
+from engine.input.invalid_notation_exception import InvalidNotationException
+from engine.input.long_notation_parser import LongNotationParser
+from engine.input.pgn_parser import PgnParser
+from engine.map.components.bitboards import to_coordinate
+from engine.map.components.board import Board
+from engine.map.components.piece import INDEX_TO_PIECE_TYPE
+from engine.search import Searcher
+
+# https://www.chessprogramming.org/Perft_Results
+# (name, fen, expected leaf nodes at depth 1, 2, ...)
+PERFT_POSITIONS = [
+    ('start', 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+     [20, 400, 8902, 197281, 4865609]),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+     [48, 2039, 97862, 4085603]),
+    ('position 3', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+     [14, 191, 2812, 43238, 674624]),
+    ('position 4', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+     [6, 264, 9467, 422333]),
+    ('position 5', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+     [44, 1486, 62379, 2103487]),
+    ('position 6', 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+     [46, 2079, 89890, 3894594]),
+]
+
+
+def run_perft(max_depth: int) -> bool:
+    long_notation_parser = LongNotationParser()
+    total_nodes = 0
+    total_seconds = 0
+    all_passed = True
+    for name, fen, expected_nodes_by_depth in PERFT_POSITIONS:
+        for depth, expected_nodes in enumerate(expected_nodes_by_depth[:max_depth], start=1):
+            board = Board.from_fen(fen, long_notation_parser=long_notation_parser)
+            start_time = time.perf_counter()
+            nodes = board.perft(depth)
+            seconds = time.perf_counter() - start_time
+            total_nodes += nodes
+            total_seconds += seconds
+            passed = nodes == expected_nodes
+            all_passed = all_passed and passed
+            print(str.format('{:<12} depth {}  {:>9} nodes  {:>9.0f} nps  {}', name, depth, nodes,
+                             nodes / seconds if seconds else 0, 'ok' if passed else
+                             str.format('FAIL (expected {})', expected_nodes)))
+    print(str.format('total {} nodes in {:.2f}s, {:.0f} nps', total_nodes, total_seconds,
+                     total_nodes / total_seconds if total_seconds else 0))
+    return all_passed
+
+
+def run_search(depth: int) -> bool:
+    '''
+    fixed depth searches of the perft positions with a fresh transposition table each, nodes per second
+    '''
+    long_notation_parser = LongNotationParser()
+    total_nodes = 0
+    total_seconds = 0
+    for name, fen, _ in PERFT_POSITIONS:
+        board = Board.from_fen(fen, long_notation_parser=long_notation_parser)
+        result = Searcher().search(board, max_depth=depth)
+        total_nodes += result.nodes
+        total_seconds += result.seconds
+        score, moves = result.variations[0]
+        print(str.format('{:<12} depth {}  {:>9} nodes  {:>9.0f} nps  score {:>6}  {}', name, result.depth,
+                         result.nodes, result.nodes / result.seconds if result.seconds else 0, score,
+                         ' '.join(long_notation_parser.parse_to_long_notation(
+                             to_coordinate(start_square), to_coordinate(dest_square),
+                             INDEX_TO_PIECE_TYPE[promotion_index] if promotion_index is not None else None)
+                             for start_square, dest_square, promotion_index in moves)))
+    print(str.format('total {} nodes in {:.2f}s, {:.0f} nps', total_nodes, total_seconds,
+                     total_nodes / total_seconds if total_seconds else 0))
+    return True
+
+
+def run_pgn_replay(path: str) -> bool:
+    pgn_parser = PgnParser()
+    games = 0
+    plies = 0
+    failed_games = 0
+    start_time = time.perf_counter()
+    with open(path) as pgn_file:
+        for pgn_game in pgn_parser.parse_games(pgn_file):
+            games += 1
+            try:
+                for _ in pgn_parser.replay(pgn_game):
+                    plies += 1
+            except InvalidNotationException as e:
+                failed_games += 1
+                print(str.format('game {}: {}', games, e))
+    seconds = time.perf_counter() - start_time
+    print(str.format('replayed {} games, {} plies in {:.2f}s, {:.0f} plies/s, {} failed', games, plies, seconds,
+                     plies / seconds if seconds else 0, failed_games))
+    return failed_games == 0
+
+
+def run_evaluation(path: str) -> bool:
+    '''
+    score every position in a pgn file one at a time, then as one batch
+    '''
+    pgn_parser = PgnParser()
+    boards_planes = []
+    players_to_move = []
+    scalar_seconds = 0
+    with open(path) as pgn_file:
+        for pgn_game in pgn_parser.parse_games(pgn_file):
+            try:
+                for board in pgn_parser.replay(pgn_game):
+                    start_time = time.perf_counter()
+                    evaluate(board)
+                    scalar_seconds += time.perf_counter() - start_time
+                    boards_planes.append(board.to_planes())
+                    players_to_move.append(board.get_player_to_move())
+            except InvalidNotationException:
+                continue
+    planes = np.stack(boards_planes)
+    start_time = time.perf_counter()
+    evaluate_planes(planes, np.array(players_to_move), with_mobility=False)
+    batch_seconds = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    evaluate_planes(planes, np.array(players_to_move))
+    mobility_seconds = time.perf_counter() - start_time
+    positions = len(boards_planes)
+    for name, seconds in (('one at a time', scalar_seconds), ('batch', batch_seconds),
+                          ('batch with mobility', mobility_seconds)):
+        print(str.format('{:<20} {} positions in {:.3f}s, {:.0f} positions/s', name, positions, seconds,
+                         positions / seconds if seconds else 0))
+    return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='check move generation against known perft counts and time it')
+    parser.add_argument('--depth', type=int, default=3, help='deepest perft or search depth to run per position')
+    parser.add_argument('--pgn', help='replay every game in this pgn file instead, timing it')
+    parser.add_argument('--search', action='store_true', help='time the built in search instead')
+    parser.add_argument('--evaluate', action='store_true',
+                        help='with --pgn, time scoring its positions one at a time against batch scoring')
+    args = parser.parse_args()
+    if args.pgn and args.evaluate:
+        passed = run_evaluation(args.pgn)
+    elif args.pgn:
+        passed = run_pgn_replay(args.pgn)
+    elif args.search:
+        passed = run_search(args.depth)
+    else:
+        passed = run_perft(args.depth)
+    if not passed:
+        sys.exit(1)
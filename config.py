@@ -20,4 +20,33 @@ class Config:
     CHESS_FONT_SPACING_COL = 6
     CAPTURES_FONT_SIZE = 15
 
+    # uci engine binary and search depth, engine processes are kept running between games
+    STOCKFISH_PATH = './stockfish'
+    STOCKFISH_DEPTH = 15
+    # play and analyse with the built in search even when the engine binary is there
+    NATIVE_ENGINE = False
+    # variations kept per analysed position
+    ANALYSIS_MULTIPV = 3
+    # engines get a fen snapshot instead of the move list once it is this long
+    UCI_SNAPSHOT_PLIES = 20
+
+    # polyglot .bin opening book consulted before the engine, keys need python-chess
+    OPENING_BOOK_PATH = None
+    # directory of syzygy .rtbw and .rtbz tables probed instead of the engine in endgames, needs python-chess
+    SYZYGY_PATH = None
+
+    # engine results kept in memory per process, optionally saved to this json file between sessions
+    ENGINE_CACHE_SIZE = 50000
+    ENGINE_CACHE_PATH = None
+
+    # finished and abandoned games are appended to this pgn file
+    PGN_PATH = None
+
+    # time each stage of the move pipeline, F2 shows the timings in game and each ply is appended to
+    # PROFILE_PATH as a json line
+    PROFILE = False
+    PROFILE_PATH = None
+    # run cProfile over the main thread for the whole session and dump pstats here on exit
+    CPROFILE_PATH = None
+
     DEBUG = False
\ No newline at end of file
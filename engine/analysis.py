@@ -0,0 +1,39 @@
+from typing import Dict, List, Optional
+
+
+class AnalysisStoppedException(Exception):
+    '''
+    the search was stopped before it finished, because its position no longer matters
+    '''
+    pass
+
+
+class PrincipalVariation:
+    def __init__(self, evaluation: Dict, long_notations: List[str]):
+        self.evaluation = evaluation
+        self.long_notations = long_notations
+
+
+class Analysis:
+    '''
+    Result of one engine search: the best move and the top variations, scored from p1's point of view.
+    '''
+
+    def __init__(self, best_move: Optional[str], evaluation: Dict, variations: List[PrincipalVariation],
+                 multipv: int):
+        self.best_move = best_move
+        self.evaluation = evaluation
+        self.variations = variations
+        # how many variations were asked for, a position may have fewer legal moves
+        self.multipv = multipv
+
+    def to_dict(self) -> Dict:
+        return {'best_move': self.best_move, 'evaluation': self.evaluation, 'multipv': self.multipv,
+                'variations': [[variation.evaluation, variation.long_notations] for variation in self.variations]}
+
+    @staticmethod
+    def from_dict(analysis_dict: Dict) -> 'Analysis':
+        return Analysis(best_move=analysis_dict['best_move'], evaluation=analysis_dict['evaluation'],
+                        variations=[PrincipalVariation(evaluation, long_notations)
+                                    for evaluation, long_notations in analysis_dict['variations']],
+                        multipv=analysis_dict['multipv'])
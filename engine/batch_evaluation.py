@@ -0,0 +1,97 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from engine.evaluation import SQUARE_SCORES
+from engine.map.components.bitboards import KNIGHT_INDEX, BISHOP_INDEX, ROOK_INDEX, QUEEN_INDEX
+from engine.map.util.attack_tables import KNIGHT_ATTACKS, STRAIGHT_DIRECTIONS, DIAG_DIRECTIONS
+
+# planes are p1's pawn, knight, bishop, rook, queen, king then p2's, see Board.to_planes
+PIECES_PER_PLAYER = 6
+# centipawns per square a piece can move to, by piece index
+MOBILITY_WEIGHTS = [0, 4, 3, 2, 1, 0]
+
+# material plus square bonus for each plane and square, negative for p2, so one matrix product scores both
+PLANE_WEIGHTS = np.array([SQUARE_SCORES[1][piece_index] for piece_index in range(PIECES_PER_PLAYER)] +
+                         [[-score for score in SQUARE_SCORES[2][piece_index]]
+                          for piece_index in range(PIECES_PER_PLAYER)], dtype=np.int32)
+KNIGHT_MOVES = np.array([[(KNIGHT_ATTACKS[square] >> dest_square) & 1 for dest_square in range(64)]
+                         for square in range(64)], dtype=np.int32)
+# padding square past the board edge, treated as occupied so rays stop there
+OFF_BOARD = 64
+
+
+def _get_ray_squares(directions: List[Tuple[int, int]]) -> np.ndarray:
+    '''
+    (64, directions, 7) squares along each ray from each square, padded with OFF_BOARD
+    '''
+    ray_squares = np.full((64, len(directions), 7), OFF_BOARD, dtype=np.intp)
+    for square in range(64):
+        for direction, (row_step, col_step) in enumerate(directions):
+            row, col = (square >> 3) + row_step, (square & 7) + col_step
+            distance = 0
+            while 0 <= row < 8 and 0 <= col < 8:
+                ray_squares[square, direction, distance] = row * 8 + col
+                row, col = row + row_step, col + col_step
+                distance += 1
+    return ray_squares
+
+
+STRAIGHT_RAY_SQUARES = _get_ray_squares(STRAIGHT_DIRECTIONS)
+DIAG_RAY_SQUARES = _get_ray_squares(DIAG_DIRECTIONS)
+# rays each piece with mobility moves along, none for knights
+MOBILITY_RAYS_BY_PIECE_INDEX = {KNIGHT_INDEX: [], BISHOP_INDEX: [DIAG_RAY_SQUARES], ROOK_INDEX: [STRAIGHT_RAY_SQUARES],
+                                QUEEN_INDEX: [STRAIGHT_RAY_SQUARES, DIAG_RAY_SQUARES]}
+
+
+def evaluate_planes(planes: np.ndarray, players_to_move: Optional[np.ndarray] = None,
+                    with_mobility: bool = True) -> np.ndarray:
+    '''
+    Centipawn scores for a stack of positions: (N, 12, 64) planes in, (N,) int32 out. Scores material and piece
+    square tables like evaluation.evaluate, plus mobility. From p1's point of view, or the player to move's if
+    players_to_move gives 1 or 2 for each position.
+    '''
+    planes = np.asarray(planes, dtype=np.uint8)
+    scores = np.einsum('nps,ps->n', planes, PLANE_WEIGHTS, dtype=np.int64).astype(np.int32)
+    if with_mobility:
+        scores += _get_mobility(planes)
+    if players_to_move is not None:
+        scores = np.where(np.asarray(players_to_move) == 1, scores, -scores)
+    return scores
+
+
+def _get_mobility(planes: np.ndarray) -> np.ndarray:
+    '''
+    weighted count of squares each minor and major piece attacks that aren't held by its own side, p1 minus p2
+    '''
+    count = planes.shape[0]
+    padded_occupied = np.concatenate([planes.max(axis=1), np.ones((count, 1), dtype=np.uint8)], axis=1)
+    mobility = np.zeros(count, dtype=np.int64)
+    for first_plane, sign in ((0, 1), (PIECES_PER_PLAYER, -1)):
+        player_planes = planes[:, first_plane:first_plane + PIECES_PER_PLAYER]
+        padded_not_own = np.concatenate([1 - player_planes.max(axis=1), np.zeros((count, 1), dtype=np.uint8)],
+                                        axis=1)
+        for piece_index, ray_squares_list in MOBILITY_RAYS_BY_PIECE_INDEX.items():
+            # only the squares that hold this piece, as (position, square) pairs
+            positions, squares = np.nonzero(player_planes[:, piece_index])
+            if not ray_squares_list:
+                moves = (padded_not_own[positions, :64] * KNIGHT_MOVES[squares]).sum(axis=1)
+            else:
+                moves = sum(_get_slider_moves(padded_occupied[positions], padded_not_own[positions],
+                                              ray_squares[squares]) for ray_squares in ray_squares_list)
+            mobility += sign * MOBILITY_WEIGHTS[piece_index] * np.bincount(positions, weights=moves,
+                                                                            minlength=count).astype(np.int64)
+    return mobility.astype(np.int32)
+
+
+def _get_slider_moves(padded_occupied: np.ndarray, padded_not_own: np.ndarray, ray_squares: np.ndarray) -> np.ndarray:
+    '''
+    squares one slider per row could move to: along each ray up to and including the first occupied square, unless
+    that one is its own side's
+    '''
+    rows = np.arange(ray_squares.shape[0])[:, None, None]
+    ray_empty = 1 - padded_occupied[rows, ray_squares]
+    # a square is reached when every square before it on the ray is empty
+    reached = np.ones(ray_empty.shape, dtype=np.uint8)
+    reached[..., 1:] = np.cumprod(ray_empty[..., :-1], axis=-1)
+    return (reached * padded_not_own[rows, ray_squares]).sum(axis=(1, 2))
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from bearlibterminal import terminal
 
 from config import Config
@@ -6,6 +8,7 @@ from engine.menu import Menu, GameStartException
 from engine.render.board_console import BoardConsole
 from engine.render.captures_console import CapturesConsole
 from engine.render.text_console import TextConsole
+from engine.stockfish import ANALYSIS_CACHE
 
 COLS = 112
 ROWS = 40
@@ -13,6 +16,9 @@ ROWS = 40
 
 class Engine():
 
+    def __init__(self, start_fen: Optional[str] = None):
+        self._start_fen = start_fen
+
     def run(self):
         terminal.open()
         terminal.composition(terminal.TK_ON)
@@ -29,28 +35,36 @@ class Engine():
             self._run_game()
 
     def _run_game(self):
-        menu = Menu(row=18, col=49)
+        menu = Menu(row=18, col=49, start_fen=self._start_fen)
         while True:
             try:
                 menu.loop()
             except GameStartException as e:
                 player_options = e.player_options
+                # the menu remembers the position for the next game
+                self._start_fen = e.start_fen
                 break
         terminal.clear()
         board_con = BoardConsole(row=2, col=5)
         text_con = TextConsole(row=Config.TEXT_CON_ROW, col=5)
         captures_con = CapturesConsole(row=Config.CAPTURES_CON_ROW, col=5)
-        game = Game(board_con=board_con, text_con=text_con, captures_con=captures_con, player_options=player_options)
-        while True:
-            try:
-                game.loop()
-            except RetryMoveException:
-                continue
-            except GameOverException:
-                # wait for any input
-                key = terminal.read()
-                if key == terminal.TK_CLOSE:
-                    raise SystemExit()
-                break
-            except BackToMenuException:
-                break
+        game = Game(board_con=board_con, text_con=text_con, captures_con=captures_con, player_options=player_options,
+                    start_fen=self._start_fen)
+        try:
+            while True:
+                try:
+                    game.loop()
+                except RetryMoveException:
+                    continue
+                except GameOverException:
+                    # wait for any input
+                    key = terminal.read()
+                    if key == terminal.TK_CLOSE:
+                        raise SystemExit()
+                    break
+                except BackToMenuException:
+                    break
+        finally:
+            # also when the window is closed mid game
+            game.close()
+            ANALYSIS_CACHE.save()
@@ -0,0 +1,61 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from debug import Debug
+
+
+class EngineCache:
+    '''
+    Least recently used engine results by position key. Optionally loaded from and saved to a json file. Safe to
+    share between the engine worker threads.
+    '''
+
+    def __init__(self, max_entries: int, path: Optional[str] = None):
+        self._max_entries = max_entries
+        self._path = path
+        self._entries = OrderedDict()
+        self._is_loaded = False
+        self._lock = threading.Lock()
+
+    def get(self, position_key: int, field: str):
+        with self._lock:
+            self._maybe_load()
+            entry = self._entries.get(position_key)
+            if entry is None or field not in entry:
+                return None
+            self._entries.move_to_end(position_key)
+            return entry[field]
+
+    def put(self, position_key: int, field: str, value):
+        with self._lock:
+            self._maybe_load()
+            entry = self._entries.setdefault(position_key, dict())
+            entry[field] = value
+            self._entries.move_to_end(position_key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def save(self):
+        with self._lock:
+            if not self._path or not self._is_loaded:
+                return
+            # json keys must be strings, keep the lru order as a list
+            entries = [[str(position_key), dict(entry)] for position_key, entry in self._entries.items()]
+        with open(self._path, 'w') as cache_file:
+            json.dump(entries, cache_file)
+
+    def _maybe_load(self):
+        if self._is_loaded:
+            return
+        self._is_loaded = True
+        if not self._path or not os.path.exists(self._path):
+            return
+        try:
+            with open(self._path) as cache_file:
+                for position_key, entry in json.load(cache_file)[-self._max_entries:]:
+                    self._entries[int(position_key)] = entry
+        except (ValueError, OSError) as e:
+            Debug.log(str.format('ignoring engine cache {}: {}', self._path, e))
@@ -0,0 +1,76 @@
+import atexit
+import shutil
+import threading
+from typing import Dict, List, Union
+
+from config import Config
+from debug import Debug
+from engine.native_engine import NativeEngine
+from engine.uci_engine import UciEngine, UciEngineException
+
+# engine path the batch scripts take to mean the built in search
+NATIVE_ENGINE_PATH = 'native'
+
+
+class EnginePool:
+    '''
+    Warm engine processes kept for the life of the app. Each role (analysis, or a cpu player) gets its own
+    engine, so its skill level is set once instead of on every query. is_native plays the built in search
+    instead. A missing engine binary raises UciEngineException, unless can_fall_back lets the built in search
+    stand in.
+    '''
+
+    def __init__(self, path: str, depth: int, is_native: bool = False, can_fall_back: bool = False):
+        self._path = path
+        self._depth = depth
+        self._is_native = is_native
+        self._can_fall_back = can_fall_back
+        self._idle_by_role: Dict[str, List[Union[UciEngine, NativeEngine]]] = dict()
+        self._lock = threading.Lock()
+
+    def acquire(self, role: str, skill_level: int) -> Union[UciEngine, NativeEngine]:
+        '''
+        reuse an idle engine that last played this role if there is one, else start a new one
+        '''
+        with self._lock:
+            idle = self._idle_by_role.get(role)
+            engine = idle.pop() if idle else None
+        if engine is None:
+            engine = self._start_engine()
+        engine.set_option('Skill Level', skill_level)
+        engine.new_game()
+        return engine
+
+    def release(self, role: str, engine: Union[UciEngine, NativeEngine]):
+        with self._lock:
+            self._idle_by_role.setdefault(role, []).append(engine)
+
+    def close(self):
+        with self._lock:
+            engines = [engine for idle in self._idle_by_role.values() for engine in idle]
+            self._idle_by_role = dict()
+        for engine in engines:
+            engine.quit()
+
+    def _start_engine(self) -> Union[UciEngine, NativeEngine]:
+        if self._is_native:
+            return NativeEngine()
+        if shutil.which(self._path) is None:
+            if not self._can_fall_back:
+                raise UciEngineException(str.format('no engine binary at {}', self._path))
+            Debug.log(str.format('no engine binary at {}, playing the built in search', self._path))
+            return NativeEngine()
+        return UciEngine(self._path, self._depth)
+
+
+def is_engine_missing(path: str) -> bool:
+    '''
+    True when path is neither native nor an engine binary that can be run
+    '''
+    return path != NATIVE_ENGINE_PATH and shutil.which(path) is None
+
+
+# the interactive game still plays without stockfish installed
+ENGINE_POOL = EnginePool(path=Config.STOCKFISH_PATH, depth=Config.STOCKFISH_DEPTH, is_native=Config.NATIVE_ENGINE,
+                         can_fall_back=True)
+atexit.register(ENGINE_POOL.close)
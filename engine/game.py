@@ -1,19 +1,32 @@
+import datetime
 import time
 import traceback
-from typing import Dict
+from concurrent.futures import Future
+from typing import Dict, Optional
 
 from bearlibterminal import terminal
 
+from config import Config
 from debug import Debug
+from engine.analysis import Analysis
 from engine.input.long_notation_parser import LongNotationParser
 from engine.input.notation_parser import NotationParser, InvalidNotationException
+from engine.input.pgn_parser import PgnGame, PgnWriter
 from engine.map.components.board import Board, IllegalMoveException
 from engine.map.util.player import Player
 from engine.menu import MenuOption
+from engine.opening_book import OPENING_BOOK
 from engine.render.board_console import BoardConsole
 from engine.render.captures_console import CapturesConsole
 from engine.render.text_console import TextConsole
 from engine.stockfish import StockfishWrapper
+from engine.stockfish_worker import StockfishWorker
+from engine.tablebase import TABLEBASE
+from engine.uci_position import UciPosition
+from profiler import PROFILER
+
+CPU_MOVE_MIN_SECONDS = .5
+INPUT_POLL_MS = 10
 
 
 class BackToMenuException(Exception):
@@ -28,32 +41,62 @@ class RetryMoveException(Exception):
     pass
 
 
+def _get_done_future(result) -> Future:
+    '''
+    a book or tablebase answer wrapped like an engine result, so both are waited on the same way
+    '''
+    future = Future()
+    future.set_result(result)
+    return future
+
+
 class Game():
 
     def __init__(self, board_con: BoardConsole, text_con: TextConsole, captures_con: CapturesConsole,
-                 player_options: Dict[int, MenuOption]):
-        self._player = 1
+                 player_options: Dict[int, MenuOption], start_fen: Optional[str] = None):
         self._captures = {1: [], 2: []}
         self._move_number = 0
-        self._move_long_notations = []
+        self._start_fen = start_fen
+        self._sans = []
+        # pgn result, * until the game ends
+        self._result = '*'
+        self._is_archived = False
         self._hint_level = 0
         self._show_score = False
         self._show_weak_squares = False
+        self._show_profile = False
+        self._analysis = None
+        self._analysis_key = None
+        # probed once per position, kept for the cpu move
+        self._tablebase_result = None
+        self._hint_coords = None
+
+        self._notation_parser = NotationParser()
+        self._long_notation_parser = LongNotationParser()
+        if start_fen:
+            self._board: Board = Board.from_fen(start_fen, long_notation_parser=self._long_notation_parser)
+            self._uci_position = UciPosition(fen=self._board.to_fen())
+        else:
+            self._board: Board = Board(long_notation_parser=self._long_notation_parser)
+            self._uci_position = UciPosition()
+        self._player = self._board.get_player_to_move()
 
         self._text_con = text_con
         self._text_con.set_player(self._player)
         self._captures_con = captures_con
         self._board_con: BoardConsole = board_con
-        self._notation_parser = NotationParser()
-        self._long_notation_parser = LongNotationParser()
-        self._board: Board = Board(long_notation_parser=self._long_notation_parser)
 
         self._stockfish_lvl_by_player = dict()
         for player in player_options.keys():
             options = player_options[player]
             if not options.is_human:
                 self._stockfish_lvl_by_player[player] = options.cpu_lvl
-        self._stockfish = StockfishWrapper()
+        self._stockfish = StockfishWorker(StockfishWrapper(self._stockfish_lvl_by_player))
+
+    def close(self):
+        self._stockfish.shutdown()
+        # a game left for the menu is kept unfinished
+        self._archive()
 
     def loop(self):
         self._move_setup()
@@ -62,64 +105,118 @@ class Game():
         self._prepare_for_next_move()
 
     def _move_setup(self):
-        self._board_con.render(self._board)
-        self._captures_con.render(self._captures)
-        self._text_con.set_evaluation(self._stockfish.get_evaluation())
-        self._render_detail()
-        terminal.refresh()
-
-        # this takes a small but noticeable amount of time so render after refreshing everything else
-        if self._board.is_in_check(self._player):
-            self._text_con.render_status('check')
-        terminal.refresh()
-
-        best_move_coords = self._long_notation_parser.parse_to_coords(self._stockfish.get_best_move())
-        self._hint_coords = best_move_coords
-        self._weak_coords = self._board.get_weak_coords(Player.other(self._player))
+        if not self._sans:
+            # a game started from a fen may be over before the first move
+            self._check_gameover()
+        # evaluation and hint arrive in the background, see _apply_analysis_if_ready
+        if self._analysis_key != self._board.get_position_key():
+            self._analysis_key = self._board.get_position_key()
+            self._tablebase_result = TABLEBASE.probe(self._board)
+            tablebase_result = self._tablebase_result
+            book_move = OPENING_BOOK.get_best_move(self._board) if tablebase_result is None else None
+            if tablebase_result:
+                # exact, no need to search
+                self._analysis = _get_done_future(
+                    Analysis(best_move=tablebase_result.best_move, evaluation=tablebase_result.evaluation,
+                             variations=[], multipv=1))
+            elif book_move:
+                # no need to ask the engine while in book
+                self._analysis = _get_done_future(
+                    Analysis(best_move=book_move, evaluation={'type': 'book', 'value': 0}, variations=[], multipv=1))
+            else:
+                self._analysis = self._stockfish.get_analysis(self._uci_position, self._analysis_key)
+            self._text_con.set_evaluation(None)
+            self._hint_coords = None
+        with PROFILER.span('check'):
+            is_in_check = self._board.is_in_check(self._player)
+        with PROFILER.span('render'):
+            self._board_con.render(self._board)
+            self._captures_con.render(self._captures)
+            self._render_detail()
+            if is_in_check:
+                self._text_con.render_status('check')
+            if self._show_profile:
+                self._text_con.render_profile()
+            terminal.refresh()
+        self._apply_analysis_if_ready()
 
     def _get_move(self):
         if self._player not in self._stockfish_lvl_by_player:
             notation_input = self._read_input(10)
             try:
-                move = self._notation_parser.parse_to_move(self._player, notation_input)
+                with PROFILER.span('parse'):
+                    move = self._notation_parser.parse_to_move(self._player, notation_input)
             except InvalidNotationException as e:
-                terminal.clear()
+                self._text_con.clear_messages()
                 self._text_con.render_error(str.format('\'{}\' {}', notation_input, str(e)))
                 traceback.print_exc()
                 raise RetryMoveException()
         else:
-            self._check_input()
-            time.sleep(.5)
-            long_notation_input = self._stockfish.get_move_at_lvl(self._stockfish_lvl_by_player[self._player])
+            lvl = self._stockfish_lvl_by_player[self._player]
+            # _move_setup already probed this position
+            tablebase_result = self._tablebase_result
+            book_move = OPENING_BOOK.get_move(self._board, lvl) if tablebase_result is None else None
+            if tablebase_result:
+                cpu_move = _get_done_future(tablebase_result.best_move)
+            elif book_move:
+                cpu_move = _get_done_future(book_move)
+            else:
+                cpu_move = self._stockfish.get_move_for_player(self._uci_position, self._board.get_position_key(),
+                                                               self._player)
+            min_end_time = time.monotonic() + CPU_MOVE_MIN_SECONDS
+            while not cpu_move.done() or time.monotonic() < min_end_time:
+                self._check_input()
+                self._apply_analysis_if_ready()
+                terminal.delay(INPUT_POLL_MS)
+            long_notation_input = cpu_move.result()
+            if long_notation_input is None:
+                # the engine found no move, so the board should have ended the game
+                self._check_gameover()
+                self._gameover(str.format('stockfish lvl {} has no move (press any key)', lvl))
             Debug.log(
-                str.format('stockfish lvl {} (p{}): {}', self._stockfish_lvl_by_player[self._player], self._player,
-                           long_notation_input))
-            move = self._long_notation_parser.parse_to_move(self._player, long_notation_input)
+                str.format('stockfish lvl {} (p{}): {}{}{}', lvl, self._player, long_notation_input,
+                           ' (tablebase)' if tablebase_result else '', ' (book)' if book_move else ''))
+            with PROFILER.span('parse'):
+                move = self._long_notation_parser.parse_to_move(self._player, long_notation_input)
         return move
 
     def _make_move(self, move):
         try:
             move_result = self._board.make_move(move, self._captures, self._move_number)
-            self._move_long_notations.append(move_result.long_notation)
+            self._uci_position = self._uci_position.push(move_result.long_notation, self._board)
+            self._sans.append(move_result.san)
         except IllegalMoveException as e:
-            terminal.clear()
+            self._text_con.clear_messages()
             self._text_con.render_error(str.format('{}', str(e)))
             raise RetryMoveException()
 
     def _render_move_end(self):
-        self._stockfish.set_position(self._move_long_notations)
-        stockfish_evaluation = self._stockfish.get_evaluation()
-        next_best_move = self._stockfish.get_best_move()
-        # if player made a move and stockfish evaluates M0 that player just won
-        if stockfish_evaluation['type'] == 'mate' and stockfish_evaluation['value'] == 0:
-            self._gameover(str.format('checkmate! p{} wins (press any key)', self._player))
-        # if player made a move and stockfish has no next best move then stalemate
-        if next_best_move is None:
+        self._check_gameover()
+        self._text_con.clear_messages()
+
+    def _check_gameover(self):
+        # if the player to move has no legal move that's mate or stalemate, otherwise the board may call a draw
+        player_to_move = self._board.get_player_to_move()
+        with PROFILER.span('check'):
+            has_legal_move = self._board.has_legal_move()
+            is_mate = not has_legal_move and self._board.is_in_check(player_to_move)
+        if not has_legal_move:
+            if is_mate:
+                winner = Player.other(player_to_move)
+                self._result = '1-0' if winner == 1 else '0-1'
+                self._gameover(str.format('checkmate! p{} wins (press any key)', winner))
+            self._result = '1/2-1/2'
             self._gameover('stalemate! (press any key)')
-        terminal.clear()
+        draw_reason = self._board.get_draw_reason()
+        if draw_reason:
+            self._result = '1/2-1/2'
+            self._gameover(str.format('draw by {}! (press any key)', draw_reason))
 
     def _gameover(self, message):
-        terminal.clear()
+        self._end_profiled_ply()
+        # right away, the window may be closed at the prompt
+        self._archive()
+        self._text_con.clear_messages()
         self._board_con.render(self._board)
         self._captures_con.render(self._captures)
         self._text_con.render_green(message)
@@ -127,17 +224,25 @@ class Game():
         raise GameOverException()
 
     def _prepare_for_next_move(self):
+        self._end_profiled_ply()
+        # anything still queued is for the position before this move
+        self._stockfish.cancel_pending()
         self._player = Player.other(self._player)
         self._text_con.set_player(self._player)
         self._move_number += 1
         self._hint_level = 0
         self._show_weak_squares = False
 
+    def _end_profiled_ply(self):
+        # a ply runs from rendering its position to checking whether the reply has a legal move
+        PROFILER.end_ply(ply=len(self._sans), san=self._sans[-1] if self._sans else None, player=self._player,
+                         cpu_lvl=self._stockfish_lvl_by_player.get(self._player))
+
     def _read_input(self, max: int) -> str:
         input = ''
         while True:
             self._text_con.render_notation_input(input)
-            key = terminal.read()
+            key = self._read_key()
             if self._handle_meta_input(key):
                 continue
             elif key == terminal.TK_RETURN:
@@ -147,6 +252,31 @@ class Game():
             elif terminal.check(terminal.TK_WCHAR) and len(input) < max:
                 input += chr(terminal.state(terminal.TK_WCHAR))
 
+    def _read_key(self):
+        '''
+        wait for a key, filling in engine results as they arrive
+        '''
+        while not terminal.has_input():
+            self._apply_analysis_if_ready()
+            terminal.delay(INPUT_POLL_MS)
+        return terminal.read()
+
+    def _apply_analysis_if_ready(self):
+        if self._analysis is None or not self._analysis.done() or self._analysis.cancelled():
+            return
+        analysis = self._analysis.result()
+        self._analysis = None
+        self._text_con.set_evaluation(analysis.evaluation)
+        if analysis.best_move:
+            self._hint_coords = self._long_notation_parser.parse_to_coords(analysis.best_move)
+        else:
+            self._hint_coords = None
+        if self._show_score:
+            self._render_detail()
+        if self._hint_level > 0 and self._hint_coords:
+            self._board_con.render_hint(hint_level=self._hint_level, hint_coords=self._hint_coords, board=self._board)
+        terminal.refresh()
+
     def _check_input(self):
         '''
         allow interrupt for a cpu vs cpu game
@@ -169,13 +299,21 @@ class Game():
             self._hint_level = (self._hint_level + 1) % 3
             if self._hint_level == 0:
                 self._board_con.refresh(self._board)
-            else:
+            elif self._hint_coords:
                 self._board_con.render_hint(hint_level=self._hint_level, hint_coords=self._hint_coords, board=self._board)
             return True
+        elif key == terminal.TK_F2 and Config.PROFILE:
+            self._show_profile = not self._show_profile
+            if self._show_profile:
+                self._text_con.render_profile()
+            else:
+                self._text_con.clear_profile()
+            return True
         elif key == terminal.TK_PERIOD:
             self._show_weak_squares = not self._show_weak_squares
             if self._show_weak_squares:
-                self._board_con.render_weak(weak_coords=self._weak_coords, board=self._board)
+                self._board_con.render_weak(weak_coords=self._board.get_weak_coords(Player.other(self._player)),
+                                            board=self._board)
             else:
                 self._board_con.refresh(self._board)
             return True
@@ -186,3 +324,25 @@ class Game():
             self._text_con.render_score()
         else:
             self._text_con.render_key_guide()
+
+    def _archive(self):
+        '''
+        append the game to Config.PGN_PATH, once
+        '''
+        if self._is_archived or not Config.PGN_PATH or not self._sans:
+            return
+        self._is_archived = True
+        PgnWriter(Config.PGN_PATH).write(self._get_pgn_game())
+
+    def _get_pgn_game(self) -> PgnGame:
+        tags = {'Event': 'termchess', 'Site': '?', 'Date': datetime.date.today().strftime('%Y.%m.%d'), 'Round': '-',
+                'White': self._get_pgn_player_name(1), 'Black': self._get_pgn_player_name(2)}
+        if self._start_fen:
+            tags['SetUp'] = '1'
+            tags['FEN'] = self._start_fen
+        return PgnGame(tags=tags, sans=self._sans, result=self._result)
+
+    def _get_pgn_player_name(self, player) -> str:
+        if player in self._stockfish_lvl_by_player:
+            return str.format('stockfish lvl {}', self._stockfish_lvl_by_player[player])
+        return 'human'
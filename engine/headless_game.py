@@ -0,0 +1,126 @@
+import random
+import time
+from typing import Dict, List, Optional
+
+from engine.engine_pool import EnginePool
+from engine.input.long_notation_parser import LongNotationParser
+from engine.map.components.board import Board
+from engine.map.util.player import Player
+from engine.opening_book import OPENING_BOOK
+from engine.tablebase import TABLEBASE
+from engine.uci_position import UciPosition
+
+WIN_RESULT_BY_PLAYER = {1: '1-0', 2: '0-1'}
+DRAW_RESULT = '1/2-1/2'
+UNFINISHED_RESULT = '*'
+
+
+class GameRecord:
+    def __init__(self, result: str, reason: str, long_notations: List[str], sans: List[str],
+                 move_seconds: List[float]):
+        # pgn style result: 1-0, 0-1, 1/2-1/2 or * when stopped at the ply limit
+        self.result = result
+        self.reason = reason
+        self.long_notations = long_notations
+        self.sans = sans
+        self.move_seconds = move_seconds
+
+    def to_dict(self) -> Dict:
+        return {'result': self.result, 'reason': self.reason, 'moves': self.long_notations,
+                'move_seconds': [round(seconds, 4) for seconds in self.move_seconds]}
+
+
+class RandomMover:
+    '''
+    Stand in for an engine: plays a random legal move. Needs no engine binary.
+    '''
+
+    def __init__(self, seed: Optional[int] = None):
+        self._random = random.Random(seed)
+        self._long_notation_parser = LongNotationParser()
+
+    def get_move(self, board: Board, position: UciPosition) -> str:
+        move = self._random.choice(list(board.legal_moves()))
+        return self._long_notation_parser.parse_to_long_notation(move.long_notation_start_coord, move.dest_coord,
+                                                                  move.promotion_piece_type)
+
+    def close(self):
+        pass
+
+
+class UciMover:
+    '''
+    A pooled uci engine playing at a fixed skill level, from the opening book while it has moves and
+    the endgame tablebase once it has the position.
+    '''
+
+    def __init__(self, engine_pool: EnginePool, role: str, skill_level: int):
+        self._engine_pool = engine_pool
+        self._role = role
+        self._skill_level = skill_level
+        self._engine = engine_pool.acquire(role, skill_level)
+
+    def get_move(self, board: Board, position: UciPosition) -> str:
+        tablebase_result = TABLEBASE.probe(board)
+        if tablebase_result:
+            return tablebase_result.best_move
+        book_move = OPENING_BOOK.get_move(board, self._skill_level)
+        if book_move:
+            return book_move
+        return self._engine.analyse(position).best_move
+
+    def close(self):
+        self._engine_pool.release(self._role, self._engine)
+
+
+def make_mover(engine_pool: EnginePool, player: int, lvl: str, seed: Optional[int] = None):
+    '''
+    lvl is a skill level 0-20, or random for a stand in engine
+    '''
+    if lvl == 'random':
+        return RandomMover(seed=seed)
+    return UciMover(engine_pool, role=str.format('p{}', player), skill_level=int(lvl))
+
+
+class HeadlessGame:
+    '''
+    A cpu vs cpu game without a terminal: no rendering, input or waiting between moves.
+    '''
+
+    def __init__(self, mover_by_player: Dict, max_plies: int, start_fen: Optional[str] = None):
+        self._mover_by_player = mover_by_player
+        self._max_plies = max_plies
+        self._start_fen = start_fen
+        self._long_notation_parser = LongNotationParser()
+
+    def play(self) -> GameRecord:
+        if self._start_fen:
+            board = Board.from_fen(self._start_fen, long_notation_parser=self._long_notation_parser)
+            position = UciPosition(fen=board.to_fen())
+        else:
+            board = Board(long_notation_parser=self._long_notation_parser)
+            position = UciPosition()
+        captures = {1: [], 2: []}
+        long_notations = []
+        sans = []
+        move_seconds = []
+        player = board.get_player_to_move()
+        while len(long_notations) < self._max_plies:
+            if not board.has_legal_move():
+                if board.is_in_check(player):
+                    return GameRecord(WIN_RESULT_BY_PLAYER[Player.other(player)], 'checkmate', long_notations,
+                                      sans, move_seconds)
+                return GameRecord(DRAW_RESULT, 'stalemate', long_notations, sans, move_seconds)
+            draw_reason = board.get_draw_reason()
+            if draw_reason:
+                return GameRecord(DRAW_RESULT, draw_reason, long_notations, sans, move_seconds)
+            start_time = time.perf_counter()
+            long_notation = self._mover_by_player[player].get_move(board, position)
+            move_seconds.append(time.perf_counter() - start_time)
+            move = self._long_notation_parser.parse_to_move(player, long_notation)
+            move_result = board.make_move(move, captures, len(long_notations))
+            position = position.push(long_notation, board)
+            long_notations.append(long_notation)
+            sans.append(move_result.san)
+            player = Player.other(player)
+        return GameRecord(UNFINISHED_RESULT, 'ply limit', long_notations, sans, move_seconds)
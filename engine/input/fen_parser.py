@@ -0,0 +1,131 @@
+from typing import Optional, Tuple
+
+from engine.input.coordinate_parser import CoordinateParser
+from engine.input.invalid_notation_exception import InvalidNotationException
+from engine.map.components.bitboards import Bitboards, to_square, to_coordinate
+from engine.map.components.piece import *
+from engine.map.util.castle_spec import P1_KINGSIDE, P1_QUEENSIDE, P2_KINGSIDE, P2_QUEENSIDE, SPECS
+from engine.map.util.player import Player
+
+FEN_CHAR_TO_PIECE = {'P': P_W, 'N': N_W, 'B': B_W, 'R': R_W, 'Q': Q_W, 'K': K_W,
+                     'p': P_B, 'n': N_B, 'b': B_B, 'r': R_B, 'q': Q_B, 'k': K_B}
+FEN_CHAR_TO_CASTLING_RIGHT = {'K': P1_KINGSIDE, 'Q': P1_QUEENSIDE, 'k': P2_KINGSIDE, 'q': P2_QUEENSIDE}
+# row an en passant square sits on, and the row of the pawn that just moved past it, by player to move
+ENPASSANT_ROW_BY_PLAYER = {1: 2, 2: 5}
+ENPASSANT_PAWN_ROW_BY_PLAYER = {1: 3, 2: 4}
+PIECE_TYPE_TO_FEN_CHAR = {Pawn: 'p', Knight: 'n', Bishop: 'b', Rook: 'r', Queen: 'q', King: 'k'}
+
+
+class FenParser:
+    def parse(self, fen: str) -> Tuple[list, int, int, Optional[int], int, int]:
+        '''
+        fen to (board array, player to move, castling rights, en passant square, halfmove clock, fullmove number).
+        the move counters are optional. castling rights without their king and rook at home are dropped
+        '''
+        fields = fen.split()
+        if len(fields) < 4 or len(fields) > 6:
+            raise InvalidNotationException('fen needs placement, player, castling and en passant fields')
+        board_array = self._parse_placement(fields[0])
+        if fields[1] not in ('w', 'b'):
+            raise InvalidNotationException(fields[1] + ' is not a player')
+        player = 1 if fields[1] == 'w' else 2
+        castling_rights = 0
+        if fields[2] != '-':
+            for char in fields[2]:
+                if char not in FEN_CHAR_TO_CASTLING_RIGHT:
+                    raise InvalidNotationException(char + ' is not a castling right')
+                castling_rights |= FEN_CHAR_TO_CASTLING_RIGHT[char]
+        castling_rights &= self._get_possible_castling_rights(board_array)
+        if fields[3] == '-':
+            enpassant_square = None
+        else:
+            enpassant_square = to_square(CoordinateParser.to_coordinate(fields[3]))
+            self._validate_enpassant_square(board_array, player, enpassant_square)
+        bitboards = Bitboards.from_board_array(board_array)
+        if bitboards.is_attacked_by(player, bitboards.get_king_square(Player.other(player))):
+            raise InvalidNotationException(str.format('p{} is in check but not to move', Player.other(player)))
+        halfmove_clock = self._parse_counter(fields[4]) if len(fields) > 4 else 0
+        fullmove_number = max(self._parse_counter(fields[5]), 1) if len(fields) > 5 else 1
+        return board_array, player, castling_rights, enpassant_square, halfmove_clock, fullmove_number
+
+    def parse_to_fen(self, board_array, player: int, castling_rights: int, enpassant_square: Optional[int],
+                     halfmove_clock: int, fullmove_number: int) -> str:
+        castling = ''.join(char for char, right in FEN_CHAR_TO_CASTLING_RIGHT.items() if castling_rights & right)
+        if enpassant_square is None:
+            enpassant = '-'
+        else:
+            enpassant = CoordinateParser.to_notation(to_coordinate(enpassant_square))
+        return str.format('{} {} {} {} {} {}', self._parse_to_placement(board_array), 'w' if player == 1 else 'b',
+                          castling or '-', enpassant, halfmove_clock, fullmove_number)
+
+    def _parse_to_placement(self, board_array) -> str:
+        rows = []
+        for board_row in board_array:
+            row = ''
+            empty_count = 0
+            for piece in board_row:
+                if piece is NON:
+                    empty_count += 1
+                    continue
+                if empty_count:
+                    row += str(empty_count)
+                    empty_count = 0
+                char = PIECE_TYPE_TO_FEN_CHAR[type(piece)]
+                row += char.upper() if piece.player == 1 else char
+            if empty_count:
+                row += str(empty_count)
+            rows.append(row)
+        return '/'.join(rows)
+
+    def _get_possible_castling_rights(self, board_array) -> int:
+        castling_rights = 0
+        for spec in SPECS:
+            king = board_array[spec.king_coord.row][spec.king_coord.col]
+            rook = board_array[spec.rook_coord.row][spec.rook_coord.col]
+            if isinstance(king, King) and king.player == spec.player and \
+                    isinstance(rook, Rook) and rook.player == spec.player:
+                castling_rights |= spec.castling_right
+        return castling_rights
+
+    def _validate_enpassant_square(self, board_array, player: int, enpassant_square: int):
+        '''
+        the square a pawn of the other player just passed over: empty, with that pawn in front of it
+        '''
+        row, col = enpassant_square >> 3, enpassant_square & 7
+        pawn = board_array[ENPASSANT_PAWN_ROW_BY_PLAYER[player]][col]
+        if row != ENPASSANT_ROW_BY_PLAYER[player] or board_array[row][col] is not NON or \
+                not isinstance(pawn, Pawn) or pawn.player != Player.other(player):
+            raise InvalidNotationException(str.format('{} is not an en passant square',
+                                                      CoordinateParser.to_notation(to_coordinate(enpassant_square))))
+
+    def _parse_counter(self, field: str) -> int:
+        if not field.isdigit():
+            raise InvalidNotationException(field + ' is not a move count')
+        return int(field)
+
+    def _parse_placement(self, placement: str):
+        rows = placement.split('/')
+        if len(rows) != 8:
+            raise InvalidNotationException('fen needs 8 ranks')
+        board_array = []
+        for row in rows:
+            board_row = []
+            for char in row:
+                if char.isdigit():
+                    board_row.extend([NON] * int(char))
+                elif char in FEN_CHAR_TO_PIECE:
+                    board_row.append(FEN_CHAR_TO_PIECE[char])
+                else:
+                    raise InvalidNotationException(char + ' is not a piece')
+            if len(board_row) != 8:
+                raise InvalidNotationException(row + ' is not 8 squares')
+            board_array.append(board_row)
+        for board_row in (board_array[0], board_array[7]):
+            if any(isinstance(piece, Pawn) for piece in board_row):
+                raise InvalidNotationException('pawns can\'t stand on the first or last rank')
+        for player in (1, 2):
+            king_count = sum(1 for board_row in board_array for piece in board_row
+                             if isinstance(piece, King) and piece.player == player)
+            if king_count != 1:
+                raise InvalidNotationException(str.format('p{} needs one king', player))
+        return board_array
@@ -1,83 +1,81 @@
-from engine.input.coordinate_parser import CoordinateParser
+import re
+from typing import List, Optional, Type
+
+from engine.input.coordinate_parser import NOTATION_TO_COORD
 from engine.input.invalid_notation_exception import InvalidNotationException
+from engine.map.components.coordinate import Coordinate
 from engine.map.components.move import Move
-from engine.map.components.piece import Pawn, NOTATION_TO_PIECE_TYPE
+from engine.map.components.piece import Piece, Pawn, King, NOTATION_TO_PIECE_TYPE, PIECE_TYPE_TO_NOTATION
 
+FILE_CHARS = 'abcdefgh'
+RANK_CHARS = '87654321'
+# lookups built once: chess notation to board row and col
+FILE_CHAR_TO_COL = {char: col for col, char in enumerate(FILE_CHARS)}
+RANK_CHAR_TO_ROW = {char: row for row, char in enumerate(RANK_CHARS)}
+CASTLE_NOTATION_TO_IS_KINGSIDE = {'O-O': True, '0-0': True, 'O-O-O': False, '0-0-0': False}
+# piece, disambiguation file, disambiguation rank, capture, destination, promotion
+SAN_PATTERN = re.compile(r'^([NBRQK]?)([a-h]?)([1-8]?)(x?)([a-h][1-8])(?:=?([NBRQ]))?$')
+# check, mate and annotation marks carry no move information
+SAN_SUFFIX_CHARS = '+#!?'
 
-class NotationParser:
-    def parse_to_move(self, player: int, notation: str) -> Move:
-        try:
-            if not notation or len(notation) == 0:
-                raise InvalidNotationException()
-            if notation[0].islower():
-                return self._parse_pawn(player, notation)
-            if notation[0] == '0' or notation[0] == 'O':
-                return self._parse_castle(player, notation)
-            else:
-                return self._parse_piece(player, notation)
-        except Exception as e:
-            raise InvalidNotationException(e)
 
-    def _parse_pawn(self, player, notation):
-        orig_notation = notation
-        is_capture = False
-        start_col = None
-        promotion_piece_type = None
-        if notation[1] == 'x':
-            is_capture = True
-            start_col = CoordinateParser.to_coordinate_col(notation[0])
-            notation = notation[2:]
-        if len(notation) > 2 and notation[2] == '=':
-            promotion_piece_type = NOTATION_TO_PIECE_TYPE[notation[3]]
-            notation = notation[:-2]
-        return Move.normal(notation=orig_notation, player=player, piece_type=Pawn,
-                           dest_coord=CoordinateParser.to_coordinate(notation=notation), is_capture=is_capture,
-                           start_col=start_col, promotion_piece=promotion_piece_type)
+class NotationParser:
+    '''
+    Standard algebraic notation to moves and back.
+    '''
 
-    def _parse_castle(self, player, notation):
-        if notation == '0-0' or notation == 'O-O':
-            return Move.castle_kingside(notation=notation, player=player)
-        if notation == '0-0-0' or notation == 'O-O-O':
+    def parse_to_move(self, player: int, notation: str) -> Move:
+        san = notation.rstrip(SAN_SUFFIX_CHARS) if notation else ''
+        if not san:
+            raise InvalidNotationException('no move')
+        if san in CASTLE_NOTATION_TO_IS_KINGSIDE:
+            if CASTLE_NOTATION_TO_IS_KINGSIDE[san]:
+                return Move.castle_kingside(notation=notation, player=player)
             return Move.castle_queenside(notation=notation, player=player)
-        raise InvalidNotationException('use 0-0 or 0-0-0 to castle')
-
-    def _parse_piece(self, player, notation):
-        orig_notation = notation
-        # first char is always the piece
-        piece_char = notation[0]
-        if piece_char not in NOTATION_TO_PIECE_TYPE.keys():
-            raise InvalidNotationException(piece_char + ' is not a piece')
-        piece_type = NOTATION_TO_PIECE_TYPE[piece_char]
-        notation = notation[1:]
-
-        # last 2 chars are always the dest coordinate
-        dest_coord_notation = notation[-2:]
-        dest_coord = CoordinateParser.to_coordinate(notation=dest_coord_notation)
-        notation = notation[:-2]
+        san_match = SAN_PATTERN.match(san)
+        if san_match is None:
+            raise InvalidNotationException(self._get_parse_error(san))
+        piece_char, file_char, rank_char, capture_char, dest_notation, promotion_char = san_match.groups()
+        piece_type = NOTATION_TO_PIECE_TYPE[piece_char] if piece_char else Pawn
+        if piece_type == Pawn and (rank_char or bool(file_char) != bool(capture_char)):
+            raise InvalidNotationException('pawn captures look like exd5')
+        return Move.normal(notation=notation, player=player, piece_type=piece_type,
+                           dest_coord=NOTATION_TO_COORD[dest_notation], is_capture=bool(capture_char),
+                           start_col=FILE_CHAR_TO_COL[file_char] if file_char else None,
+                           start_row=RANK_CHAR_TO_ROW[rank_char] if rank_char else None,
+                           promotion_piece=NOTATION_TO_PIECE_TYPE[promotion_char] if promotion_char else None)
 
-        # capture notation if it exists
-        if notation and notation[-1] == 'x':
-            is_capture = True
-            notation = notation[:-1]
-        else:
-            is_capture = False
+    def parse_to_san(self, piece_type: Type[Piece], start_coord: Coordinate, dest_coord: Coordinate,
+                     is_capture: bool, promotion_piece_type: Optional[Type[Piece]],
+                     other_start_coords: List[Coordinate], is_check: bool, has_legal_reply: bool) -> str:
+        '''
+        other_start_coords: squares of other pieces of the same type that can legally move to dest too
+        '''
+        suffix = ('+' if has_legal_reply else '#') if is_check else ''
+        if piece_type == King and abs(start_coord.col - dest_coord.col) == 2:
+            return ('O-O' if dest_coord.col > start_coord.col else 'O-O-O') + suffix
+        dest_notation = dest_coord.notation
+        if piece_type == Pawn:
+            san = FILE_CHARS[start_coord.col] + 'x' + dest_notation if is_capture else dest_notation
+            if promotion_piece_type:
+                san += '=' + PIECE_TYPE_TO_NOTATION[promotion_piece_type]
+            return san + suffix
+        return PIECE_TYPE_TO_NOTATION[piece_type] + self._get_disambiguation(start_coord, other_start_coords) + \
+            ('x' if is_capture else '') + dest_notation + suffix
 
-        # whatever is left is disambiguation as rank and/or file
-        start_row = None
-        start_col = None
-        if notation:
-            if len(notation) > 2:
-                raise InvalidNotationException()
-            elif len(notation) == 2:
-                disambiguation_coord = CoordinateParser.to_coordinate(notation=notation)
-                start_row = disambiguation_coord.row
-                start_col = disambiguation_coord.col
-            else:
-                try:
-                    start_row = CoordinateParser.to_coordinate_row(notation[0])
-                except:
-                    start_col = CoordinateParser.to_coordinate_col(notation[0])
+    def _get_disambiguation(self, start_coord: Coordinate, other_start_coords: List[Coordinate]) -> str:
+        # file if it tells the pieces apart, else rank, else both
+        if not other_start_coords:
+            return ''
+        if all(other_start_coord.col != start_coord.col for other_start_coord in other_start_coords):
+            return FILE_CHARS[start_coord.col]
+        if all(other_start_coord.row != start_coord.row for other_start_coord in other_start_coords):
+            return RANK_CHARS[start_coord.row]
+        return start_coord.notation
 
-        return Move.normal(notation=orig_notation, player=player, piece_type=piece_type,
-                           dest_coord=dest_coord, is_capture=is_capture,
-                           start_row=start_row, start_col=start_col)
+    def _get_parse_error(self, san: str) -> str:
+        if san[0].isupper() and san[0] not in NOTATION_TO_PIECE_TYPE:
+            return san[0] + ' is not a piece'
+        if san[0] in 'oO0':
+            return 'use 0-0 or 0-0-0 to castle'
+        return 'can\'t parse ' + san
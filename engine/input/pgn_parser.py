@@ -0,0 +1,164 @@
+import re
+from collections import OrderedDict
+from typing import Dict, Iterator, List, TextIO
+
+from engine.input.fen_parser import FenParser
+from engine.input.invalid_notation_exception import InvalidNotationException
+from engine.input.long_notation_parser import LongNotationParser
+from engine.input.notation_parser import NotationParser
+from engine.map.components.board import Board, IllegalMoveException
+
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+# the seven tag roster, in the order pgn export puts them
+SEVEN_TAG_ROSTER = ['Event', 'Site', 'Date', 'Round', 'White', 'Black', 'Result']
+# greedy value: some exporters don't escape quotes inside tag values
+TAG_PATTERN = re.compile(r'^\[(\w+)\s+"(.*)"\]\s*$')
+MOVE_NUMBER_PATTERN = re.compile(r'^\d+\.+')
+SAN_SUFFIX_CHARS = '+#!?'
+MAX_LINE_LENGTH = 79
+
+
+class PgnGame:
+    def __init__(self, tags: Dict[str, str], sans: List[str], result: str):
+        self.tags = tags
+        self.sans = sans
+        self.result = result
+
+
+class PgnParser:
+    '''
+    Streams games out of pgn text one at a time, so a database of any size is read in constant memory.
+    '''
+
+    def __init__(self):
+        self._notation_parser = NotationParser()
+        self._long_notation_parser = LongNotationParser()
+
+    def parse_games(self, pgn_file: TextIO) -> Iterator[PgnGame]:
+        tags = OrderedDict()
+        sans = []
+        result = None
+        # movetext state that carries across lines
+        comment_depth = 0
+        variation_depth = 0
+        is_in_movetext = False
+        for line in pgn_file:
+            line = line.strip()
+            if comment_depth == 0 and variation_depth == 0:
+                if line.startswith('%'):
+                    continue
+                tag_match = TAG_PATTERN.match(line)
+                if tag_match:
+                    if is_in_movetext:
+                        # a game without a result token still ends at the next game's tags
+                        yield PgnGame(tags, sans, result or tags.get('Result', '*'))
+                        tags, sans, result, is_in_movetext = OrderedDict(), [], None, False
+                    tags[tag_match.group(1)] = tag_match.group(2).replace('\\"', '"').replace('\\\\', '\\')
+                    continue
+            if not line:
+                continue
+            is_in_movetext = True
+            for token in self._tokenize(line):
+                if comment_depth:
+                    comment_depth -= token == '}'
+                elif token == '{':
+                    comment_depth = 1
+                elif token == ';':
+                    break
+                elif token == '(':
+                    variation_depth += 1
+                elif token == ')':
+                    variation_depth = max(variation_depth - 1, 0)
+                elif variation_depth or token.startswith('$'):
+                    continue
+                elif token in RESULTS:
+                    result = token
+                    yield PgnGame(tags, sans, result)
+                    tags, sans, result, is_in_movetext = OrderedDict(), [], None, False
+                else:
+                    san = MOVE_NUMBER_PATTERN.sub('', token).rstrip(SAN_SUFFIX_CHARS)
+                    if san and san != 'e.p.':
+                        sans.append(san)
+        if is_in_movetext or tags:
+            yield PgnGame(tags, sans, result or tags.get('Result', '*'))
+
+    def replay(self, pgn_game: PgnGame) -> Iterator[Board]:
+        '''
+        play the game's moves on a board, yielding the same board after each move
+        '''
+        if 'FEN' in pgn_game.tags:
+            board = Board.from_fen(pgn_game.tags['FEN'], long_notation_parser=self._long_notation_parser)
+        else:
+            board = Board(long_notation_parser=self._long_notation_parser)
+        captures = {1: [], 2: []}
+        for ply, san in enumerate(pgn_game.sans):
+            try:
+                move = self._notation_parser.parse_to_move(board.get_player_to_move(), san)
+                board.make_move(move, captures, ply)
+            except (InvalidNotationException, IllegalMoveException) as e:
+                raise InvalidNotationException(str.format('ply {} {}: {}', ply + 1, san, e))
+            yield board
+
+    def parse_to_pgn(self, pgn_game: PgnGame) -> str:
+        tags = OrderedDict((tag, pgn_game.tags.get(tag, '????.??.??' if tag == 'Date' else '?'))
+                           for tag in SEVEN_TAG_ROSTER)
+        tags['Result'] = pgn_game.result
+        for tag, value in pgn_game.tags.items():
+            if tag not in tags:
+                tags[tag] = value
+        lines = [str.format('[{} "{}"]', tag, value.replace('\\', '\\\\').replace('"', '\\"'))
+                 for tag, value in tags.items()]
+        lines.append('')
+        lines.extend(self._wrap(self._get_movetext_tokens(pgn_game)))
+        return '\n'.join(lines) + '\n\n'
+
+    def _get_movetext_tokens(self, pgn_game: PgnGame) -> List[str]:
+        tokens = []
+        player = 1
+        fullmove_number = 1
+        if 'FEN' in pgn_game.tags:
+            _, player, _, _, _, fullmove_number = FenParser().parse(pgn_game.tags['FEN'])
+        for ply, san in enumerate(pgn_game.sans):
+            if player == 1:
+                tokens.append(str.format('{}.', fullmove_number))
+            elif ply == 0:
+                tokens.append(str.format('{}...', fullmove_number))
+            tokens.append(san)
+            if player == 2:
+                fullmove_number += 1
+            player = 2 if player == 1 else 1
+        tokens.append(pgn_game.result)
+        return tokens
+
+    def _wrap(self, tokens: List[str]) -> List[str]:
+        lines = []
+        line = ''
+        for token in tokens:
+            if line and len(line) + 1 + len(token) > MAX_LINE_LENGTH:
+                lines.append(line)
+                line = token
+            else:
+                line = line + ' ' + token if line else token
+        if line:
+            lines.append(line)
+        return lines
+
+    def _tokenize(self, line: str) -> Iterator[str]:
+        # braces and parens split tokens even without spaces around them
+        for token in line.replace('{', ' { ').replace('}', ' } ').replace('(', ' ( ').replace(')', ' ) ') \
+                .replace(';', ' ; ').split():
+            yield token
+
+
+class PgnWriter:
+    '''
+    Appends games to a pgn file as they finish.
+    '''
+
+    def __init__(self, path: str):
+        self._path = path
+        self._pgn_parser = PgnParser()
+
+    def write(self, pgn_game: PgnGame):
+        with open(self._path, 'a') as pgn_file:
+            pgn_file.write(self._pgn_parser.parse_to_pgn(pgn_game))
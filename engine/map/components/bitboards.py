@@ -0,0 +1,127 @@
+from typing import Iterator
+
+from engine.map.components.coordinate import Coordinate, SQUARES
+from engine.map.components.piece import *
+from engine.map.util.attack_tables import KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, rook_attacks, \
+    bishop_attacks, queen_attacks
+from engine.map.util.player import Player
+
+ROW_MASKS = [0xFF << (8 * row) for row in range(8)]
+COL_MASKS = [0x0101010101010101 << col for col in range(8)]
+# a8 is a light square
+LIGHT_SQUARES = sum(1 << square for square in range(64) if ((square >> 3) + square) % 2 == 0)
+PAWN_INDEX = PIECE_TYPE_TO_INDEX[Pawn]
+KNIGHT_INDEX = PIECE_TYPE_TO_INDEX[Knight]
+BISHOP_INDEX = PIECE_TYPE_TO_INDEX[Bishop]
+ROOK_INDEX = PIECE_TYPE_TO_INDEX[Rook]
+QUEEN_INDEX = PIECE_TYPE_TO_INDEX[Queen]
+KING_INDEX = PIECE_TYPE_TO_INDEX[King]
+
+
+def to_square(coord: Coordinate) -> int:
+    '''
+    bit index for a coordinate: row * 8 + col, so a8 is 0 and h1 is 63
+    '''
+    return coord.index
+
+
+def to_coordinate(square: int) -> Coordinate:
+    return SQUARES[square]
+
+
+def yield_squares(bitboard: int) -> Iterator[int]:
+    '''
+    yield the index of each set bit, lowest first
+    '''
+    while bitboard:
+        lowest_bit = bitboard & -bitboard
+        yield lowest_bit.bit_length() - 1
+        bitboard ^= lowest_bit
+
+
+class Bitboards:
+    '''
+    Piece placement as 64 bit integers: one per piece type and player, plus occupancy masks.
+    '''
+
+    def __init__(self):
+        self.pieces = {1: [0] * len(INDEX_TO_PIECE_TYPE), 2: [0] * len(INDEX_TO_PIECE_TYPE)}
+        self.occupied = {1: 0, 2: 0}
+        self.all = 0
+
+    @staticmethod
+    def from_board_array(board_array) -> 'Bitboards':
+        bitboards = Bitboards()
+        for row in range(len(board_array)):
+            for col in range(len(board_array[row])):
+                piece = board_array[row][col]
+                if not isinstance(piece, Empty):
+                    bitboards.add(piece.player, PIECE_TYPE_TO_INDEX[type(piece)], row * 8 + col)
+        return bitboards
+
+    def add(self, player: int, piece_index: int, square: int):
+        bit = 1 << square
+        self.pieces[player][piece_index] |= bit
+        self.occupied[player] |= bit
+        self.all |= bit
+
+    def remove(self, player: int, piece_index: int, square: int):
+        mask = ~(1 << square)
+        self.pieces[player][piece_index] &= mask
+        self.occupied[player] &= mask
+        self.all &= mask
+
+    def move(self, player: int, piece_index: int, start_square: int, dest_square: int):
+        bits = (1 << start_square) | (1 << dest_square)
+        self.pieces[player][piece_index] ^= bits
+        self.occupied[player] ^= bits
+        self.all ^= bits
+
+    def get_king_square(self, player: int) -> int:
+        king_bitboard = self.pieces[player][KING_INDEX]
+        if not king_bitboard:
+            raise SystemError(str.format('no king for p{}', player))
+        return (king_bitboard & -king_bitboard).bit_length() - 1
+
+    def is_attacked_by(self, player: int, square: int) -> bool:
+        '''
+        look outwards from the square with each piece's attack pattern and test for a matching attacker
+        '''
+        pieces = self.pieces[player]
+        if KNIGHT_ATTACKS[square] & pieces[KNIGHT_INDEX]:
+            return True
+        if KING_ATTACKS[square] & pieces[KING_INDEX]:
+            return True
+        if PAWN_ATTACKS[Player.other(player)][square] & pieces[PAWN_INDEX]:
+            return True
+        if rook_attacks(square, self.all) & (pieces[ROOK_INDEX] | pieces[QUEEN_INDEX]):
+            return True
+        if bishop_attacks(square, self.all) & (pieces[BISHOP_INDEX] | pieces[QUEEN_INDEX]):
+            return True
+        return False
+
+    def get_attack_map(self, player: int) -> int:
+        '''
+        union of the attacks of every piece the player has, own pieces included so defended squares count
+        '''
+        attack_map = 0
+        for piece_index, piece_bitboard in enumerate(self.pieces[player]):
+            for square in yield_squares(piece_bitboard):
+                attack_map |= self.get_attacks(player, piece_index, square)
+        return attack_map
+
+    def get_attacks(self, player: int, piece_index: int, square: int) -> int:
+        '''
+        squares attacked by a piece of this type standing on the square
+        '''
+        if piece_index == PAWN_INDEX:
+            return PAWN_ATTACKS[player][square]
+        if piece_index == KNIGHT_INDEX:
+            return KNIGHT_ATTACKS[square]
+        if piece_index == BISHOP_INDEX:
+            return bishop_attacks(square, self.all)
+        if piece_index == ROOK_INDEX:
+            return rook_attacks(square, self.all)
+        if piece_index == QUEEN_INDEX:
+            return queen_attacks(square, self.all)
+        return KING_ATTACKS[square]
@@ -1,17 +1,34 @@
-from typing import List, Tuple
+from typing import Dict, List, Tuple, Iterator, Optional
+
+import numpy as np
 
 from engine.input.coordinate_parser import CoordinateParser
+from engine.input.fen_parser import FenParser
 from engine.input.long_notation_parser import LongNotationParser
+from engine.input.notation_parser import NotationParser
+from engine.map.components.bitboards import *
 from engine.map.components.coordinate import Coordinate
 from engine.map.components.move import Move
 from engine.map.components.move_result import MoveResult
 from engine.map.components.piece import *
 from engine.map.components.tile import Tile
-from engine.map.util.castle_spec import CastleSpec, get_castle_spec_for_king_coords
+from engine.map.components.undo_record import UndoRecord
+from engine.map.util.castle_spec import *
 from engine.map.util.player import Player
+from engine.map.util.zobrist import *
 from engine.map.components.tile_map import TileGenerator
+from profiler import PROFILER
 
-NON = Empty()
+# (start square, dest square, promotion piece index or None)
+BitboardMove = Tuple[int, int, Optional[int]]
+PROMOTION_INDEXES = [QUEEN_INDEX, ROOK_INDEX, BISHOP_INDEX, KNIGHT_INDEX]
+SLIDING_AND_STEPPING_INDEXES = [KNIGHT_INDEX, BISHOP_INDEX, ROOK_INDEX, QUEEN_INDEX, KING_INDEX]
+# halfmoves without a capture or pawn move, and times the same position comes up, that draw the game
+FIFTY_MOVE_HALFMOVES = 100
+REPETITIONS_FOR_DRAW = 3
+THREEFOLD_REPETITION = 'threefold repetition'
+FIFTY_MOVE_RULE = 'fifty move rule'
+INSUFFICIENT_MATERIAL = 'insufficient material'
 
 
 class IllegalMoveException(Exception):
@@ -21,22 +38,46 @@ class IllegalMoveException(Exception):
 class Board:
     def __init__(self, long_notation_parser: LongNotationParser):
         self._long_notation_parser = long_notation_parser
-        self._board_array = [[R_B(), N_B(), B_B(), Q_B(), K_B(), B_B(), N_B(), R_B()],
-                             [P_B(), P_B(), P_B(), P_B(), P_B(), P_B(), P_B(), P_B()],
+        self._board_array = [[R_B, N_B, B_B, Q_B, K_B, B_B, N_B, R_B],
+                             [P_B, P_B, P_B, P_B, P_B, P_B, P_B, P_B],
                              [NON, NON, NON, NON, NON, NON, NON, NON],
                              [NON, NON, NON, NON, NON, NON, NON, NON],
                              [NON, NON, NON, NON, NON, NON, NON, NON],
                              [NON, NON, NON, NON, NON, NON, NON, NON],
-                             [P_W(), P_W(), P_W(), P_W(), P_W(), P_W(), P_W(), P_W()],
-                             [R_W(), N_W(), B_W(), Q_W(), K_W(), B_W(), N_W(), R_W()]]
+                             [P_W, P_W, P_W, P_W, P_W, P_W, P_W, P_W],
+                             [R_W, N_W, B_W, Q_W, K_W, B_W, N_W, R_W]]
+        self._bitboards = Bitboards.from_board_array(self._board_array)
+        self._player = 1
+        self._castling_rights = ALL_CASTLING_RIGHTS
+        self._enpassant_square = None
+        self._undo_stack: List[UndoRecord] = []
+        # fullmove number of the starting position, the undo stack covers the moves since
+        self._start_fullmove_number = 1
+        self._halfmove_clock = 0
+        self._key = self._compute_key()
+        # times each position key has come up in this game, so repetitions are one lookup
+        self._key_counts: Dict[int, int] = {self._key: 1}
+        # squares each player attacks or defends, valid for the position with this key
+        self._attack_maps_key = None
+        self._attack_maps: Dict[int, int] = dict()
         self._tile_generator = TileGenerator()
+        self._notation_parser = NotationParser()
         self._refresh_tiles()
 
-    def _copy_board_array(self):
-        return [row[:] for row in self._board_array]
+    @staticmethod
+    def from_fen(fen: str, long_notation_parser: LongNotationParser) -> 'Board':
+        board = Board(long_notation_parser=long_notation_parser)
+        board._board_array, board._player, board._castling_rights, board._enpassant_square, \
+            board._halfmove_clock, board._start_fullmove_number = FenParser().parse(fen)
+        board._bitboards = Bitboards.from_board_array(board._board_array)
+        board._key = board._compute_key()
+        board._key_counts = {board._key: 1}
+        board._refresh_tiles()
+        return board
 
     def _refresh_tiles(self):
-        self._tile_generator.refresh_tiles(self._board_array)
+        with PROFILER.span('tiles'):
+            self._tile_generator.refresh_tiles(self._board_array)
 
     def get_tiles(self):
         return self._tile_generator.get_tiles()
@@ -46,58 +87,204 @@ class Board:
 
     def get_weak_coords(self, player) -> List[Coordinate]:
         '''
-        Return weak coordinates for this player
+        Return weak coordinates for this player: pieces none of their own pieces defend
         '''
-        weak_coords = []
-        for coord in self._yield_coordinates():
-            piece = self._piece_at(coord)
-            if piece is None or piece.player != player:
-                continue
-            if not self._does_player_target(player, [coord]):
-                weak_coords.append(coord)
-        return weak_coords
+        weak_bitboard = self._bitboards.occupied[player] & ~self._get_attack_map(player)
+        return list(self._yield_bitboard_coordinates(weak_bitboard))
 
     def make_move(self, move: Move, captures, move_number: int) -> MoveResult:
+        if move.player != self._player:
+            raise IllegalMoveException(str.format('p{} is to move', self._player))
         if move.long_notation_start_coord:
-            start_coord, dest_coord = self._make_exact_move(move, captures, move_number)
+            start_coord, dest_coord = self._make_exact_move(move, captures)
         elif move.is_castle_kingside:
-            start_coord, dest_coord = self._make_castle(move.player, CastleSpec(move.player, is_kingside=True))
+            start_coord, dest_coord = self._make_castle(move.player, SPECS_BY_PLAYER_AND_SIDE[(move.player, True)])
         elif move.is_castle_queenside:
-            start_coord, dest_coord = self._make_castle(move.player, CastleSpec(move.player, is_kingside=False))
+            start_coord, dest_coord = self._make_castle(move.player, SPECS_BY_PLAYER_AND_SIDE[(move.player, False)])
         else:
-            start_coord, dest_coord = self._make_move(move, captures, move_number)
+            start_coord, dest_coord = self._make_move(move, captures)
         self._refresh_tiles()
+        with PROFILER.span('san'):
+            san = self._get_last_move_san()
         return MoveResult(long_notation=self._long_notation_parser.parse_to_long_notation(start_coord, dest_coord,
-                                                                                          move.promotion_piece_type))
+                                                                                          move.promotion_piece_type),
+                          san=san)
+
+    def unmake_move(self, captures):
+        '''
+        Take back the last move, returning any piece it captured from the captures.
+        '''
+        if not self._undo_stack:
+            raise IllegalMoveException('no move to take back')
+        undo_record = self._pop()
+        if undo_record.captured_piece is not NON:
+            captures[undo_record.moved_piece.player].remove(undo_record.captured_piece)
+        self._refresh_tiles()
+
+    def to_fen(self) -> str:
+        return FenParser().parse_to_fen(self._board_array, self._player, self._castling_rights, self._enpassant_square,
+                                        self._get_halfmove_clock(), self._get_fullmove_number())
+
+    def to_planes(self) -> np.ndarray:
+        '''
+        (12, 64) uint8 piece placement: p1's pawn, knight, bishop, rook, queen and king planes then p2's, indexed
+        by square. Stack them to score many positions in one call with batch_evaluation.evaluate_planes
+        '''
+        bitboards = np.array(self._bitboards.pieces[1] + self._bitboards.pieces[2], dtype='<u8')
+        return np.unpackbits(bitboards.view(np.uint8).reshape(12, 8), axis=1, bitorder='little')
+
+    def get_player_to_move(self) -> int:
+        return self._player
+
+    def is_last_move_irreversible(self) -> bool:
+        '''
+        True after a capture, pawn move or loss of castling or en passant rights: no earlier position can come back.
+        '''
+        if not self._undo_stack:
+            return False
+        undo_record = self._undo_stack[-1]
+        return undo_record.captured_piece is not NON or isinstance(undo_record.moved_piece, Pawn) \
+            or undo_record.castling_rights != self._castling_rights or undo_record.enpassant_square is not None
+
+    def get_castling_rights(self) -> int:
+        '''
+        bitmask of the castling rights left, see castle_spec
+        '''
+        return self._castling_rights
+
+    def get_enpassant_square(self) -> Optional[int]:
+        '''
+        square a pawn can take en passant on this move, whether or not any pawn is there to take
+        '''
+        return self._enpassant_square
+
+    def get_position_key(self) -> int:
+        '''
+        64 bit zobrist key covering piece placement, player to move, castling rights and en passant
+        '''
+        return self._key
+
+    def get_draw_reason(self) -> Optional[str]:
+        '''
+        why the game is drawn in this position, or None. mate and stalemate are checked separately
+        '''
+        if self._key_counts[self._key] >= REPETITIONS_FOR_DRAW:
+            return THREEFOLD_REPETITION
+        if self._halfmove_clock >= FIFTY_MOVE_HALFMOVES:
+            return FIFTY_MOVE_RULE
+        if self.is_insufficient_material():
+            return INSUFFICIENT_MATERIAL
+        return None
+
+    def is_insufficient_material(self) -> bool:
+        '''
+        neither side can mate: bare kings, a single knight or bishop, or only bishops all on one square colour
+        '''
+        pieces = self._bitboards.pieces
+        for player in (1, 2):
+            if pieces[player][PAWN_INDEX] or pieces[player][ROOK_INDEX] or pieces[player][QUEEN_INDEX]:
+                return False
+        knights = pieces[1][KNIGHT_INDEX] | pieces[2][KNIGHT_INDEX]
+        bishops = pieces[1][BISHOP_INDEX] | pieces[2][BISHOP_INDEX]
+        minors = knights | bishops
+        if minors & (minors - 1) == 0:
+            return True
+        return not knights and (bishops & LIGHT_SQUARES == 0 or bishops & ~LIGHT_SQUARES == 0)
 
     def is_in_check(self, player):
-        return self._does_player_target(Player.other(player), [self._get_king_coord(player)])
+        return self._get_attack_map(Player.other(player)) & (1 << self._bitboards.get_king_square(player)) != 0
+
+    def legal_moves(self) -> Iterator[Move]:
+        '''
+        Yield every legal move for the player to move, including castling, en passant and each promotion.
+        '''
+        for start_square, dest_square, promotion_index in self._generate_legal_moves():
+            yield Move.exact(player=self._player, start_coord=to_coordinate(start_square),
+                             dest_coord=to_coordinate(dest_square),
+                             promotion_piece_type=INDEX_TO_PIECE_TYPE[promotion_index]
+                             if promotion_index is not None else None)
+
+    def has_legal_move(self) -> bool:
+        for _ in self._generate_legal_moves():
+            return True
+        return False
+
+    def perft(self, depth: int) -> int:
+        '''
+        Count the leaf nodes of the legal move tree to this depth.
+        '''
+        if depth == 0:
+            return 1
+        moves = list(self._generate_legal_moves())
+        if depth == 1:
+            return len(moves)
+        nodes = 0
+        for move in moves:
+            self._push(move)
+            nodes += self.perft(depth - 1)
+            self._pop()
+        return nodes
+
+    def get_pseudo_legal_moves(self) -> List[BitboardMove]:
+        '''
+        Moves for the player to move that may leave their king in check, for searches that test legality after
+        pushing: push, then pop again if is_king_attacked for the player who moved.
+        '''
+        return self._get_pseudo_legal_moves()
+
+    def push(self, move: BitboardMove):
+        '''
+        Play a move from get_pseudo_legal_moves without validating it or updating tiles. Pop takes it back.
+        '''
+        self._push(move)
+
+    def pop(self):
+        self._pop()
+
+    def is_king_attacked(self, player: int) -> bool:
+        '''
+        Same answer as is_in_check from one square lookup, cheaper than an attack map inside a search
+        '''
+        return self._bitboards.is_attacked_by(Player.other(player), self._bitboards.get_king_square(player))
+
+    def get_piece_at_square(self, square: int) -> Piece:
+        return self._board_array[square >> 3][square & 7]
+
+    def get_piece_bitboards(self, player: int) -> List[int]:
+        '''
+        one bitboard per piece index, see PIECE_TYPE_TO_INDEX. don't modify them
+        '''
+        return self._bitboards.pieces[player]
+
+    def get_piece_count(self) -> int:
+        return bin(self._bitboards.occupied[1] | self._bitboards.occupied[2]).count('1')
 
-    def _make_exact_move(self, move, captures, move_number):
+    def _make_exact_move(self, move, captures):
         # check for castle notation
         maybe_king = self._piece_at(move.long_notation_start_coord)
         if isinstance(maybe_king, King) and abs(move.long_notation_start_coord.col - move.dest_coord.col) > 1:
             self._make_castle(move.player, castle_spec=get_castle_spec_for_king_coords(
                 king_start_coord=move.long_notation_start_coord, king_dest_coord=move.dest_coord))
         else:  # this is a normal move
-            self._commit_move(move.player, move.long_notation_start_coord, move.dest_coord, move.promotion_piece_type,
-                              captures, move_number)
+            with PROFILER.span('commit'):
+                self._commit_move(move.player, move.long_notation_start_coord, move.dest_coord,
+                                  move.promotion_piece_type, captures)
         return (move.long_notation_start_coord, move.dest_coord)
 
     def _make_castle(self, player, castle_spec: CastleSpec) -> Tuple[Coordinate, Coordinate]:
-        self._validate_castle(player, castle_spec)
-        self._commit_castle(castle_spec)
+        with PROFILER.span('validate'):
+            self._validate_castle(player, castle_spec)
+        with PROFILER.span('commit'):
+            self._commit_castle(castle_spec)
         return (castle_spec.king_coord, castle_spec.dest_king_coord)
 
     def _validate_castle(self, player, castle_spec):
         if not isinstance(self._piece_at(castle_spec.king_coord), King):
             raise IllegalMoveException('king out of position to castle')
-        if self._piece_at(castle_spec.king_coord).has_moved:
-            raise IllegalMoveException('king has already moved')
         if not isinstance(self._piece_at(castle_spec.rook_coord), Rook):
             raise IllegalMoveException('rook out of position to castle')
-        if self._piece_at(castle_spec.rook_coord).has_moved:
-            raise IllegalMoveException('rook has already moved')
+        if not self._castling_rights & castle_spec.castling_right:
+            raise IllegalMoveException('king or rook has already moved')
         if not self._is_unobstructed(castle_spec.passthru_coords):
             raise IllegalMoveException('castle path is blocked')
         all_king_coords = Coordinate.get_straight_path(castle_spec.king_coord, castle_spec.dest_king_coord)
@@ -106,19 +293,14 @@ class Board:
             raise IllegalMoveException('king would move through or into check')
 
     def _commit_castle(self, castle_spec):
-        self._board_array[castle_spec.dest_king_coord.row][castle_spec.dest_king_coord.col] = \
-            self._board_array[castle_spec.king_coord.row][castle_spec.king_coord.col]
-        self._board_array[castle_spec.king_coord.row][castle_spec.king_coord.col] = NON
-        self._board_array[castle_spec.dest_rook_coord.row][castle_spec.dest_rook_coord.col] = \
-            self._board_array[castle_spec.rook_coord.row][castle_spec.rook_coord.col]
-        self._board_array[castle_spec.rook_coord.row][castle_spec.rook_coord.col] = NON
-
-    def _make_move(self, move, captures, move_number) -> Tuple[Coordinate, Coordinate]:
+        # pushing the king move also moves the rook
+        self._push((castle_spec.king_square, castle_spec.dest_king_square, None))
+
+    def _make_move(self, move, captures) -> Tuple[Coordinate, Coordinate]:
         if move.player == self._piece_at(move.dest_coord).player:
             raise IllegalMoveException(str.format('{} is occupied', CoordinateParser.to_notation(move.dest_coord)))
         if move.piece_type == Pawn and move.is_capture:
-            is_en_passant = self._maybe_get_enpassant_pawn_coord(player=move.player, coord=move.dest_coord,
-                                                                 move_number=move_number) != None
+            is_en_passant = self._maybe_get_enpassant_pawn_coord(player=move.player, coord=move.dest_coord) != None
             if self._piece_at(move.dest_coord) is NON and not is_en_passant:
                 raise IllegalMoveException(
                     str.format('nothing to capture on {}', CoordinateParser.to_notation(move.dest_coord)))
@@ -138,64 +320,39 @@ class Board:
             if (move.player == 1 and move.dest_coord.row != 0) or (move.player == 2 and move.dest_coord.row != 7):
                 raise IllegalMoveException('very sneaky')
         # at this point we know that the move would be legal if there were a matching piece
-        legal_piece_coordinate = self._find_piece_coord_with_legal_move(move)
+        with PROFILER.span('validate'):
+            legal_piece_coordinate = self._find_piece_coord_with_legal_move(move)
         # we've found the piece matching this move, make the move
-        self._commit_move(move.player, legal_piece_coordinate, move.dest_coord, move.promotion_piece_type, captures,
-                          move_number)
+        with PROFILER.span('commit'):
+            self._commit_move(move.player, legal_piece_coordinate, move.dest_coord, move.promotion_piece_type,
+                              captures)
         return (legal_piece_coordinate, move.dest_coord)
 
-    def _commit_move(self, player, start_coord, dest_coord, promotion_piece_type, captures, move_number):
+    def _commit_move(self, player, start_coord, dest_coord, promotion_piece_type, captures):
         '''
         Update the board state given a coordinate for a piece which we know can legally make this move.
         '''
-        prev_board_array = self._copy_board_array()
-        piece = self._piece_at(start_coord)
-        # handle piece capture
-        if self._piece_at(dest_coord) is not NON:
-            captured_pawn = self._board_array[dest_coord.row][dest_coord.col]
-            captures[player].append(captured_pawn)
-        elif isinstance(piece, Pawn):
-            maybe_enpassant_coord = self._maybe_get_enpassant_pawn_coord(player=player, coord=dest_coord,
-                                                                         move_number=move_number)
-            if maybe_enpassant_coord:
-                captured_pawn = self._board_array[maybe_enpassant_coord.row][maybe_enpassant_coord.col]
-                self._board_array[maybe_enpassant_coord.row][maybe_enpassant_coord.col] = NON
-                captures[player].append(captured_pawn)
-        # update the piece's new square
-        if promotion_piece_type:
-            self._board_array[dest_coord.row][dest_coord.col] = promotion_piece_type(player=player)
-        else:
-            self._board_array[dest_coord.row][dest_coord.col] = piece
-        # clear the piece's previous square
-        self._board_array[start_coord.row][start_coord.col] = NON
+        promotion_index = PIECE_TYPE_TO_INDEX[promotion_piece_type] if promotion_piece_type else None
+        undo_record = self._push((to_square(start_coord), to_square(dest_coord), promotion_index))
 
         # is the king in check in this new state? if yes revert
-        if self.is_in_check(player):
-            self._board_array = prev_board_array
+        if self.is_king_attacked(player):
+            self._pop()
             raise IllegalMoveException('move puts or leaves king in check')
 
-        # set state for en passant
-        if isinstance(piece, Pawn) and abs(start_coord.row - dest_coord.row) == 2:
-            piece.can_enpassant_at_move_num = move_number
-        if not piece.has_moved:
-            piece.has_moved = True
+        if undo_record.captured_piece is not NON:
+            captures[player].append(undo_record.captured_piece)
 
     def _find_piece_coord_with_legal_move(self, move) -> Coordinate:
         '''
         find the coordinate for the piece that this move should apply to
         '''
-        candidate_piece_coords = set()
-        for coord in self._yield_coordinates():
-            piece = self._piece_at(coord)
-            if piece.player != move.player:
-                continue
-            if not isinstance(piece, move.piece_type):
-                continue
-            if move.start_col is not None and move.start_col != coord.col:
-                continue
-            if move.start_row is not None and move.start_row != coord.row:
-                continue
-            candidate_piece_coords.add(coord)
+        candidate_bitboard = self._bitboards.pieces[move.player][PIECE_TYPE_TO_INDEX[move.piece_type]]
+        if move.start_col is not None:
+            candidate_bitboard &= COL_MASKS[move.start_col]
+        if move.start_row is not None:
+            candidate_bitboard &= ROW_MASKS[move.start_row]
+        candidate_piece_coords = set(self._yield_bitboard_coordinates(candidate_bitboard))
         if not candidate_piece_coords:
             raise IllegalMoveException(str.format('no {} to move', move.piece_type.__name__))
 
@@ -205,6 +362,11 @@ class Board:
                 legal_piece_coords.add(candidate_piece_coord)
         if not legal_piece_coords:
             raise IllegalMoveException(str.format('{} is not a legal move', move.notation))
+        if len(legal_piece_coords) > 1:
+            # notation doesn't disambiguate from pinned pieces
+            legal_piece_coords = {coord for coord in legal_piece_coords
+                                  if not self._leaves_king_in_check(move.player, coord, move.dest_coord)} \
+                                 or legal_piece_coords
         if len(legal_piece_coords) > 1:
             example_coord = legal_piece_coords.pop()
             example_piece = self._piece_at(example_coord)
@@ -215,6 +377,49 @@ class Board:
                 str.format('multiple pieces match {}, use e.g. {}', move.notation, example_notation))
         return legal_piece_coords.pop()
 
+    def _leaves_king_in_check(self, player: int, start_coord: Coordinate, dest_coord: Coordinate) -> bool:
+        # promotion piece doesn't matter for the king's safety
+        self._push((to_square(start_coord), to_square(dest_coord), None))
+        is_in_check = self.is_king_attacked(player)
+        self._pop()
+        return is_in_check
+
+    def _get_last_move_san(self) -> str:
+        '''
+        standard algebraic notation for the move on top of the undo stack
+        '''
+        undo_record = self._pop()
+        start_square, dest_square, promotion_index = undo_record.move
+        other_start_coords = [to_coordinate(square) for square in self._get_other_start_squares(undo_record)]
+        self._push(undo_record.move)
+        is_check = self.is_king_attacked(self._player)
+        return self._notation_parser.parse_to_san(
+            piece_type=type(undo_record.moved_piece), start_coord=to_coordinate(start_square),
+            dest_coord=to_coordinate(dest_square), is_capture=undo_record.captured_piece is not NON,
+            promotion_piece_type=INDEX_TO_PIECE_TYPE[promotion_index] if promotion_index is not None else None,
+            other_start_coords=other_start_coords, is_check=is_check,
+            has_legal_reply=not is_check or self.has_legal_move())
+
+    def _get_other_start_squares(self, undo_record: UndoRecord) -> List[int]:
+        '''
+        squares of the other pieces of the moved type that could legally have moved to the same square
+        '''
+        start_square, dest_square, _ = undo_record.move
+        piece_index = PIECE_TYPE_TO_INDEX[type(undo_record.moved_piece)]
+        if piece_index == PAWN_INDEX:
+            return []
+        player = self._player
+        # pieces move symmetrically, so whatever this piece type attacks from dest can reach dest
+        candidate_bitboard = self._bitboards.get_attacks(player, piece_index, dest_square) & \
+            self._bitboards.pieces[player][piece_index] & ~(1 << start_square)
+        other_start_squares = []
+        for candidate_square in yield_squares(candidate_bitboard):
+            self._push((candidate_square, dest_square, None))
+            if not self._bitboards.is_attacked_by(Player.other(player), self._bitboards.get_king_square(player)):
+                other_start_squares.append(candidate_square)
+            self._pop()
+        return other_start_squares
+
     def _is_legal_move(self, player: int, start_coord: Coordinate, dest_coord: Coordinate, is_capture: bool):
         piece = self._piece_at(start_coord)
         if isinstance(piece, King):
@@ -232,38 +437,19 @@ class Board:
         return False
 
     def _is_legal_rook_move(self, start_coord, dest_coord):
-        try:
-            path_coords = start_coord.get_straight_path(dest_coord)
-        except:
-            return False
-        return self._is_unobstructed(path_coords)
+        return self._does_piece_index_target(ROOK_INDEX, None, start_coord, dest_coord)
 
     def _is_legal_bishop_move(self, start_coord, dest_coord):
-        try:
-            path_coords = start_coord.get_diag_path(dest_coord)
-        except:
-            return False
-        return self._is_unobstructed(path_coords)
+        return self._does_piece_index_target(BISHOP_INDEX, None, start_coord, dest_coord)
 
     def _is_legal_queen_move(self, start_coord, dest_coord):
-        try:
-            path_coords = start_coord.get_straight_path(dest_coord)
-        except:
-            try:
-                path_coords = start_coord.get_diag_path(dest_coord)
-            except:
-                return False
-        return self._is_unobstructed(path_coords)
+        return self._does_piece_index_target(QUEEN_INDEX, None, start_coord, dest_coord)
 
     def _is_legal_king_move(self, start_coord, dest_coord):
-        return (abs(start_coord.row - dest_coord.row) <= 1 and abs(
-            start_coord.col - dest_coord.col) <= 1)
+        return self._does_piece_index_target(KING_INDEX, None, start_coord, dest_coord)
 
     def _is_legal_knight_move(self, start_coord, dest_coord):
-        return (abs(start_coord.row - dest_coord.row) == 2 and abs(
-            start_coord.col - dest_coord.col) == 1) or (
-                       abs(start_coord.row - dest_coord.row) == 1 and abs(
-                   start_coord.col - dest_coord.col) == 2)
+        return self._does_piece_index_target(KNIGHT_INDEX, None, start_coord, dest_coord)
 
     def _is_legal_pawn_move(self, player, start_coord, dest_coord, is_capture):
         if not is_capture:
@@ -274,11 +460,14 @@ class Board:
     def _is_legal_pawn_push(self, player: int, start_coord: Coordinate, dest_coord: Coordinate):
         if start_coord.col != dest_coord.col:
             return False
-        # allow 2 sq distance on first move, else 1
+        # allow 2 sq distance from the starting rank, else 1
         move_distance = abs(start_coord.row - dest_coord.row)
-        max_move = 1 if self._piece_at(start_coord).has_moved else 2
+        max_move = 2 if start_coord.row == (6 if player == 1 else 1) else 1
         if move_distance > max_move:
             return False
+        if move_distance == 2 and self._piece_at(Coordinate((start_coord.row + dest_coord.row) // 2,
+                                                            start_coord.col)) is not NON:
+            return False
         # assert that pawn is moving forward
         if player == 1 and start_coord.row - dest_coord.row < 0:
             return False
@@ -287,42 +476,194 @@ class Board:
         return True
 
     def _is_legal_pawn_capture(self, player: int, start_coord: Coordinate, dest_coord: Coordinate):
-        if player == 1:
-            return dest_coord.row == start_coord.row - 1 and (
-                    dest_coord.col == start_coord.col - 1 or dest_coord.col == start_coord.col + 1)
-        if player == 2:
-            return dest_coord.row == start_coord.row + 1 and (
-                    dest_coord.col == start_coord.col - 1 or dest_coord.col == start_coord.col + 1)
+        return self._does_piece_index_target(PAWN_INDEX, player, start_coord, dest_coord)
 
-    def _maybe_get_enpassant_pawn_coord(self, player, coord: Coordinate, move_number: int):
+    def _maybe_get_enpassant_pawn_coord(self, player, coord: Coordinate):
+        if self._enpassant_square is None or to_square(coord) != self._enpassant_square:
+            return None
         if player == 1:
-            if coord.row != 2:
-                return None
-            maybe_enpassant_pawn_coord = Coordinate(row=coord.row + 1, col=coord.col)
+            return Coordinate(row=coord.row + 1, col=coord.col)
         elif player == 2:
-            if coord.row != 5:
-                return None
-            maybe_enpassant_pawn_coord = Coordinate(row=coord.row - 1, col=coord.col)
+            return Coordinate(row=coord.row - 1, col=coord.col)
         else:
             raise SystemError()
-        if not isinstance(self._piece_at(maybe_enpassant_pawn_coord), Pawn):
-            return None
-        if self._piece_at(maybe_enpassant_pawn_coord).can_enpassant_at_move_num == move_number - 1:
-            return maybe_enpassant_pawn_coord
-        else:
-            return None
 
-    def _get_king_coord(self, player):
-        for coord in self._yield_coordinates():
-            piece = self._piece_at(coord)
-            if piece.player == player and isinstance(piece, King):
-                return coord
-        raise SystemError(str.format('no king for p{}', player))
+    def _get_halfmove_clock(self) -> int:
+        return self._halfmove_clock
+
+    def _get_fullmove_number(self) -> int:
+        first_player = self._undo_stack[0].moved_piece.player if self._undo_stack else self._player
+        return self._start_fullmove_number + (len(self._undo_stack) + (1 if first_player == 2 else 0)) // 2
+
+    def _compute_key(self) -> int:
+        return compute_key(self._bitboards, self._player, self._castling_rights, self._enpassant_square)
+
+    def _add_piece(self, square: int, piece: Piece):
+        piece_index = PIECE_TYPE_TO_INDEX[type(piece)]
+        self._board_array[square >> 3][square & 7] = piece
+        self._bitboards.add(piece.player, piece_index, square)
+        self._key ^= PIECE_SQUARE_KEYS[piece.player][piece_index][square]
+
+    def _remove_piece(self, square: int) -> Piece:
+        piece = self._board_array[square >> 3][square & 7]
+        piece_index = PIECE_TYPE_TO_INDEX[type(piece)]
+        self._board_array[square >> 3][square & 7] = NON
+        self._bitboards.remove(piece.player, piece_index, square)
+        self._key ^= PIECE_SQUARE_KEYS[piece.player][piece_index][square]
+        return piece
+
+    def _move_piece(self, start_square: int, dest_square: int) -> Piece:
+        piece = self._board_array[start_square >> 3][start_square & 7]
+        piece_index = PIECE_TYPE_TO_INDEX[type(piece)]
+        self._board_array[start_square >> 3][start_square & 7] = NON
+        self._board_array[dest_square >> 3][dest_square & 7] = piece
+        self._bitboards.move(piece.player, piece_index, start_square, dest_square)
+        square_keys = PIECE_SQUARE_KEYS[piece.player][piece_index]
+        self._key ^= square_keys[start_square] ^ square_keys[dest_square]
+        return piece
+
+    def _push(self, move: BitboardMove) -> UndoRecord:
+        '''
+        Play a move we know follows the piece's movement rules. Pop it to take it back.
+        '''
+        start_square, dest_square, promotion_index = move
+        player = self._player
+        moved_piece = self._board_array[start_square >> 3][start_square & 7]
+        moved_piece_index = PIECE_TYPE_TO_INDEX[type(moved_piece)]
+        captured_square = dest_square
+        if moved_piece_index == PAWN_INDEX and dest_square == self._enpassant_square:
+            captured_square = dest_square + (8 if player == 1 else -8)
+        captured_piece = self._board_array[captured_square >> 3][captured_square & 7]
+        undo_record = UndoRecord(move, moved_piece, captured_piece, captured_square, self._castling_rights,
+                                 self._enpassant_square, self._key, self._halfmove_clock)
+        self._undo_stack.append(undo_record)
+        self._key ^= CASTLING_RIGHTS_KEYS[self._castling_rights] ^ get_enpassant_key(self._bitboards, player,
+                                                                                     self._enpassant_square)
+
+        if captured_piece is not NON:
+            self._remove_piece(captured_square)
+        if promotion_index is None:
+            self._move_piece(start_square, dest_square)
+        else:
+            self._remove_piece(start_square)
+            self._add_piece(dest_square, INDEX_TO_PIECE_TYPE[promotion_index](player=player))
+        if moved_piece_index == KING_INDEX and abs(start_square - dest_square) == 2:
+            castle_spec = SPECS_BY_DEST_KING_SQUARE[dest_square]
+            self._move_piece(castle_spec.rook_square, castle_spec.dest_rook_square)
+
+        self._castling_rights &= CASTLING_RIGHTS_KEPT[start_square] & CASTLING_RIGHTS_KEPT[dest_square]
+        if moved_piece_index == PAWN_INDEX and abs(start_square - dest_square) == 16:
+            self._enpassant_square = (start_square + dest_square) // 2
+        else:
+            self._enpassant_square = None
+        if moved_piece_index == PAWN_INDEX or captured_piece is not NON:
+            self._halfmove_clock = 0
+        else:
+            self._halfmove_clock += 1
+        self._player = Player.other(player)
+        self._key ^= CASTLING_RIGHTS_KEYS[self._castling_rights] ^ PLAYER_2_TO_MOVE_KEY ^ get_enpassant_key(
+            self._bitboards, self._player, self._enpassant_square)
+        self._key_counts[self._key] = self._key_counts.get(self._key, 0) + 1
+        return undo_record
+
+    def _pop(self) -> UndoRecord:
+        undo_record = self._undo_stack.pop()
+        key_count = self._key_counts[self._key] - 1
+        if key_count:
+            self._key_counts[self._key] = key_count
+        else:
+            del self._key_counts[self._key]
+        start_square, dest_square, promotion_index = undo_record.move
+        self._player = undo_record.moved_piece.player
+        self._castling_rights = undo_record.castling_rights
+        self._enpassant_square = undo_record.enpassant_square
+
+        if promotion_index is None:
+            self._move_piece(dest_square, start_square)
+        else:
+            self._remove_piece(dest_square)
+            self._add_piece(start_square, undo_record.moved_piece)
+        if undo_record.captured_piece is not NON:
+            self._add_piece(undo_record.captured_square, undo_record.captured_piece)
+        if isinstance(undo_record.moved_piece, King) and abs(start_square - dest_square) == 2:
+            castle_spec = SPECS_BY_DEST_KING_SQUARE[dest_square]
+            self._move_piece(castle_spec.dest_rook_square, castle_spec.rook_square)
+        self._key = undo_record.key
+        self._halfmove_clock = undo_record.halfmove_clock
+        return undo_record
+
+    def _generate_legal_moves(self) -> Iterator[BitboardMove]:
+        player = self._player
+        for move in self._get_pseudo_legal_moves():
+            self._push(move)
+            is_legal = not self.is_king_attacked(player)
+            self._pop()
+            if is_legal:
+                yield move
+
+    def _get_pseudo_legal_moves(self) -> List[BitboardMove]:
+        '''
+        Moves that follow each piece's movement rules but may leave the king in check.
+        '''
+        moves = []
+        bitboards = self._bitboards
+        player = self._player
+        other_player = Player.other(player)
+        pieces = bitboards.pieces[player]
+        not_own = ~bitboards.occupied[player]
+
+        pawn_targets = bitboards.occupied[other_player]
+        if self._enpassant_square is not None:
+            pawn_targets |= 1 << self._enpassant_square
+        forward = -8 if player == 1 else 8
+        start_row = 6 if player == 1 else 1
+        promotion_row = 0 if player == 1 else 7
+        for start_square in yield_squares(pieces[PAWN_INDEX]):
+            dest_bitboard = PAWN_ATTACKS[player][start_square] & pawn_targets
+            one_step = start_square + forward
+            if not bitboards.all & (1 << one_step):
+                dest_bitboard |= 1 << one_step
+                two_step = one_step + forward
+                if start_square >> 3 == start_row and not bitboards.all & (1 << two_step):
+                    dest_bitboard |= 1 << two_step
+            for dest_square in yield_squares(dest_bitboard):
+                if dest_square >> 3 == promotion_row:
+                    for promotion_index in PROMOTION_INDEXES:
+                        moves.append((start_square, dest_square, promotion_index))
+                else:
+                    moves.append((start_square, dest_square, None))
+
+        for piece_index in SLIDING_AND_STEPPING_INDEXES:
+            for start_square in yield_squares(pieces[piece_index]):
+                for dest_square in yield_squares(bitboards.get_attacks(player, piece_index, start_square) & not_own):
+                    moves.append((start_square, dest_square, None))
+
+        for castle_spec in SPECS:
+            if castle_spec.player != player or not self._castling_rights & castle_spec.castling_right:
+                continue
+            if bitboards.all & castle_spec.passthru_mask:
+                continue
+            if any(bitboards.is_attacked_by(other_player, square) for square in castle_spec.king_path_squares):
+                continue
+            moves.append((castle_spec.king_square, castle_spec.dest_king_square, None))
+        return moves
 
-    def _yield_coordinates(self):
-        for r in range(len(self._board_array)):
-            for c in range(len(self._board_array[r])):
-                yield Coordinate(row=r, col=c)
+    def _get_attack_map(self, player: int) -> int:
+        '''
+        bitboard of every square the player attacks or defends, built once per position
+        '''
+        # the key changes with every move and comes back on unmake, so a stale map is never used and push/pop
+        # during move generation costs nothing
+        if self._attack_maps_key != self._key:
+            self._attack_maps_key = self._key
+            self._attack_maps = dict()
+        if player not in self._attack_maps:
+            self._attack_maps[player] = self._bitboards.get_attack_map(player)
+        return self._attack_maps[player]
+
+    def _yield_bitboard_coordinates(self, bitboard: int):
+        for square in yield_squares(bitboard):
+            yield to_coordinate(square)
 
     def _piece_at(self, coord) -> Piece:
         return self._board_array[coord.row][coord.col]
@@ -334,28 +675,11 @@ class Board:
         return True
 
     def _does_player_target(self, player, coords_to_check: List[Coordinate]):
-        for coord in self._yield_coordinates():
-            piece = self._piece_at(coord)
-            if piece.player != player or piece is NON:
-                continue
-            for coord_to_check in coords_to_check:
-                if self._does_player_piece_target(player, piece_coord=coord, dest_coord=coord_to_check):
-                    return True
+        for coord_to_check in coords_to_check:
+            if self._bitboards.is_attacked_by(player, to_square(coord_to_check)):
+                return True
         return False
 
-    def _does_player_piece_target(self, player, piece_coord: Coordinate, dest_coord: Coordinate) -> bool:
-        piece = self._piece_at(piece_coord)
-        if piece is NON:
-            return False
-        if isinstance(piece, King):
-            return self._is_legal_king_move(piece_coord, dest_coord)
-        if isinstance(piece, Rook):
-            return self._is_legal_rook_move(piece_coord, dest_coord)
-        if isinstance(piece, Bishop):
-            return self._is_legal_bishop_move(piece_coord, dest_coord)
-        if isinstance(piece, Queen):
-            return self._is_legal_queen_move(piece_coord, dest_coord)
-        if isinstance(piece, Knight):
-            return self._is_legal_knight_move(piece_coord, dest_coord)
-        if isinstance(piece, Pawn):
-            return self._is_legal_pawn_capture(player, piece_coord, dest_coord)
+    def _does_piece_index_target(self, piece_index, player, piece_coord: Coordinate, dest_coord: Coordinate) -> bool:
+        attacks = self._bitboards.get_attacks(player, piece_index, to_square(piece_coord))
+        return attacks & (1 << to_square(dest_coord)) != 0
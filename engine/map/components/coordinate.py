@@ -2,24 +2,39 @@ from typing import List
 
 
 class Coordinate():
-
-    def __init__(self, row: int, col: int):
-        self.row = row
-        self.col = col
+    '''
+    One of the 64 squares. Squares are built once and shared: Coordinate(row, col) always returns the same
+    immutable object, so squares compare by identity.
+    '''
+    __slots__ = ('row', 'col', 'index', 'notation')
+
+    def __new__(cls, row: int, col: int) -> 'Coordinate':
+        if not (0 <= row < 8 and 0 <= col < 8):
+            raise ValueError(str.format('row {} col {} is off the board', row, col))
+        return SQUARES[(row << 3) | col]
+
+    @classmethod
+    def _build(cls, index: int) -> 'Coordinate':
+        coord = object.__new__(cls)
+        object.__setattr__(coord, 'row', index >> 3)
+        object.__setattr__(coord, 'col', index & 7)
+        # index matches the bitboard square, notation is the chess name
+        object.__setattr__(coord, 'index', index)
+        object.__setattr__(coord, 'notation', str.format('{}{}', chr(ord('a') + (index & 7)), 8 - (index >> 3)))
+        return coord
+
+    def __setattr__(self, name, value):
+        raise AttributeError('coordinates are immutable')
+
+    def __reduce__(self):
+        # unpickle to the shared square
+        return (Coordinate, (self.row, self.col))
 
     def __str__(self):
         return str.format("Coordinate(row={}, col={})", self.row, self.col)
 
-    def __key(self):
-        return (self.row, self.col)
-
     def __hash__(self):
-        return hash(self.__key())
-
-    def __eq__(self, other):
-        if isinstance(other, Coordinate):
-            return self.__key() == other.__key()
-        return NotImplemented
+        return self.index
 
     def get_straight_path(self, other: 'Coordinate') -> List['Coordinate']:
         if self.row == other.row:
@@ -41,3 +56,6 @@ class Coordinate():
                 return [Coordinate(other.row + offset, other.col + offset) for offset in range(1, self.row - other.row)]
             else:
                 return [Coordinate(other.row + offset, other.col - offset) for offset in range(1, self.row - other.row)]
+
+
+SQUARES = [Coordinate._build(index) for index in range(64)]
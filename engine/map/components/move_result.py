@@ -1,3 +1,4 @@
 class MoveResult:
-    def __init__(self, long_notation: str):
+    def __init__(self, long_notation: str, san: str):
         self.long_notation = long_notation
+        self.san = san
@@ -1,96 +1,108 @@
 class Piece:
-    def __init__(self, solid_char, empty_char, player, notation_char, piece_value):
-        self.char = solid_char
-        self.player = player
-        self.notation_char = notation_char
-        self.piece_value = piece_value
-        self.empty_char = empty_char
-        self.has_moved = False
+    '''
+    Pieces are flyweights: the traits of a type live on its class and each type and player has one shared,
+    immutable instance, so Rook(player=1) always returns the same object.
+    '''
+    __slots__ = ('player',)
+    char = ' '
+    empty_char = ' '
+    notation_char = ''
+    piece_value = 0
+
+    def __new__(cls, player: int) -> 'Piece':
+        return PIECES_BY_TYPE_AND_PLAYER[(cls, player)]
+
+    @classmethod
+    def _build(cls, player) -> 'Piece':
+        piece = object.__new__(cls)
+        object.__setattr__(piece, 'player', player)
+        return piece
+
+    def __setattr__(self, name, value):
+        raise AttributeError('pieces are immutable')
+
+    def __reduce__(self):
+        # unpickle to the shared piece
+        return (type(self), (self.player,))
 
 
 class Pawn(Piece):
-    def __init__(self, player):
-        super().__init__('o', 'p', player, 'P', 1)
-        self.can_enpassant_at_move_num = -1
+    __slots__ = ()
+    char = 'o'
+    empty_char = 'p'
+    notation_char = 'P'
+    piece_value = 1
 
 
 class Rook(Piece):
-    def __init__(self, player):
-        super().__init__('t', 'r', player, 'R', 5)
+    __slots__ = ()
+    char = 't'
+    empty_char = 'r'
+    notation_char = 'R'
+    piece_value = 5
 
 
 class Knight(Piece):
-    def __init__(self, player):
-        super().__init__('m', 'n', player, 'N', 3)
+    __slots__ = ()
+    char = 'm'
+    empty_char = 'n'
+    notation_char = 'N'
+    piece_value = 3
 
 
 class Bishop(Piece):
-    def __init__(self, player):
-        super().__init__('v', 'b', player, 'B', 3)
+    __slots__ = ()
+    char = 'v'
+    empty_char = 'b'
+    notation_char = 'B'
+    piece_value = 3
 
 
 class King(Piece):
-    def __init__(self, player):
-        super().__init__('l', 'k', player, 'K', 100)
+    __slots__ = ()
+    char = 'l'
+    empty_char = 'k'
+    notation_char = 'K'
+    piece_value = 100
 
 
 class Queen(Piece):
-    def __init__(self, player):
-        super().__init__('w', 'q', player, 'Q', 9)
+    __slots__ = ()
+    char = 'w'
+    empty_char = 'q'
+    notation_char = 'Q'
+    piece_value = 9
 
 
 class Empty(Piece):
-    def __init__(self):
-        super().__init__(' ', ' ', None, '', 0)
+    __slots__ = ()
+
+    def __new__(cls, player=None) -> 'Empty':
+        return PIECES_BY_TYPE_AND_PLAYER[(cls, None)]
 
 
 NOTATION_TO_PIECE_TYPE = {'R': Rook, 'N': Knight, 'B': Bishop, 'Q': Queen, 'K': King}
 PIECE_TYPE_TO_NOTATION = {Rook: 'R', Knight: 'N', Bishop: 'B', Queen: 'Q', King: 'K'}
-
-
-def R_B():
-    return Rook(player=2)
-
-
-def R_W():
-    return Rook(player=1)
-
-
-def N_B():
-    return Knight(player=2)
-
-
-def N_W():
-    return Knight(player=1)
-
-
-def B_B():
-    return Bishop(player=2)
-
-
-def B_W():
-    return Bishop(player=1)
-
-
-def K_B():
-    return King(player=2)
-
-
-def K_W():
-    return King(player=1)
-
-
-def Q_B():
-    return Queen(player=2)
-
-
-def Q_W():
-    return Queen(player=1)
-
-
-def P_B():
-    return Pawn(player=2)
-
-
-def P_W():
-    return Pawn(player=1)
+# index of each piece type's bitboard
+PIECE_TYPE_TO_INDEX = {Pawn: 0, Knight: 1, Bishop: 2, Rook: 3, Queen: 4, King: 5}
+INDEX_TO_PIECE_TYPE = [Pawn, Knight, Bishop, Rook, Queen, King]
+
+# the 12 pieces plus the empty square, built once
+PIECES_BY_TYPE_AND_PLAYER = {(piece_type, player): piece_type._build(player)
+                             for piece_type in INDEX_TO_PIECE_TYPE for player in (1, 2)}
+PIECES_BY_TYPE_AND_PLAYER[(Empty, None)] = Empty._build(None)
+
+NON = Empty()
+
+R_B = Rook(player=2)
+R_W = Rook(player=1)
+N_B = Knight(player=2)
+N_W = Knight(player=1)
+B_B = Bishop(player=2)
+B_W = Bishop(player=1)
+K_B = King(player=2)
+K_W = King(player=1)
+Q_B = Queen(player=2)
+Q_W = Queen(player=1)
+P_B = Pawn(player=2)
+P_W = Pawn(player=1)
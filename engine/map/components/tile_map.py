@@ -5,8 +5,27 @@ from engine.map.components.tile import Tile
 
 class TileGenerator:
 
+    def __init__(self):
+        self._tile_grid = None
+        self._piece_grid = None
+
     def refresh_tiles(self, board_array):
-        self._tile_grid = self._get_tile_grid(board_array)
+        '''
+        only rebuild tiles whose piece changed since the last refresh
+        '''
+        if self._tile_grid is None:
+            self._tile_grid = [[self._get_tile(r, c, piece) for c, piece in enumerate(board_row)]
+                               for r, board_row in enumerate(board_array)]
+            self._piece_grid = [list(board_row) for board_row in board_array]
+            return
+        for r in range(len(board_array)):
+            board_row = board_array[r]
+            piece_row = self._piece_grid[r]
+            for c in range(len(board_row)):
+                # pieces are shared per type and player, so identity tells us whether the square looks different
+                if board_row[c] is not piece_row[c]:
+                    piece_row[c] = board_row[c]
+                    self._tile_grid[r][c] = self._get_tile(r, c, board_row[c])
 
     def get_tiles(self):
         for row in range(len(self._tile_grid)):
@@ -16,17 +35,9 @@ class TileGenerator:
     def get_tile_at(self, coord: Coordinate):
         return self._tile_grid[coord.row][coord.col]
 
-    def _get_tile_grid(self, board_array):
-        tile_grid = []
-        is_dark_square = False
-        for r in range(len(board_array)):
-            tile_grid.append([])
-            for c in range(len(board_array[r])):
-                piece = board_array[r][c]
-                tile_grid[r].append(Tile(coordinate=Coordinate(row=r, col=c),
-                                         bg_color=Config.DARK_SQ_COLOR if is_dark_square else Config.LIGHT_SQ_COLOR,
-                                         char=piece.char,
-                                         char_color=Config.WHITE_PIECE_COLOR if piece.player == 1 else Config.BLACK_PIECE_COLOR))
-                is_dark_square = not is_dark_square
-            is_dark_square = not is_dark_square
-        return tile_grid
+    def _get_tile(self, r, c, piece):
+        is_dark_square = (r + c) % 2 == 1
+        return Tile(coordinate=Coordinate(row=r, col=c),
+                    bg_color=Config.DARK_SQ_COLOR if is_dark_square else Config.LIGHT_SQ_COLOR,
+                    char=piece.char,
+                    char_color=Config.WHITE_PIECE_COLOR if piece.player == 1 else Config.BLACK_PIECE_COLOR)
@@ -0,0 +1,23 @@
+from typing import Optional, Tuple
+
+from engine.map.components.piece import Piece
+
+
+class UndoRecord:
+    '''
+    What a pushed move changed beyond the moving piece, so it can be popped without copying the board.
+    '''
+    __slots__ = ('move', 'moved_piece', 'captured_piece', 'captured_square', 'castling_rights', 'enpassant_square',
+                 'key', 'halfmove_clock')
+
+    def __init__(self, move: Tuple[int, int, Optional[int]], moved_piece: Piece, captured_piece: Piece,
+                 captured_square: int, castling_rights: int, enpassant_square: Optional[int], key: int,
+                 halfmove_clock: int):
+        self.move = move
+        self.moved_piece = moved_piece
+        self.captured_piece = captured_piece
+        self.captured_square = captured_square
+        self.castling_rights = castling_rights
+        self.enpassant_square = enpassant_square
+        self.key = key
+        self.halfmove_clock = halfmove_clock
@@ -0,0 +1,76 @@
+# attack sets precomputed at import. squares are bitboard indexes (row * 8 + col, a8 is 0)
+from typing import List, Tuple
+
+# (row step, col step)
+KNIGHT_STEPS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
+KING_STEPS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+STRAIGHT_DIRECTIONS = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+DIAG_DIRECTIONS = [(1, 1), (1, -1), (-1, -1), (-1, 1)]
+
+
+def _step_attacks(steps: List[Tuple[int, int]]) -> List[int]:
+    table = []
+    for square in range(64):
+        row, col = square >> 3, square & 7
+        attacks = 0
+        for row_step, col_step in steps:
+            dest_row, dest_col = row + row_step, col + col_step
+            if 0 <= dest_row < 8 and 0 <= dest_col < 8:
+                attacks |= 1 << (dest_row * 8 + dest_col)
+        table.append(attacks)
+    return table
+
+
+def _ray(square: int, row_step: int, col_step: int) -> int:
+    row, col = (square >> 3) + row_step, (square & 7) + col_step
+    ray = 0
+    while 0 <= row < 8 and 0 <= col < 8:
+        ray |= 1 << (row * 8 + col)
+        row, col = row + row_step, col + col_step
+    return ray
+
+
+def _ray_tables(directions: List[Tuple[int, int]]) -> List[Tuple[List[int], bool]]:
+    '''
+    one ray table per direction, flagged with whether the ray runs towards higher square indexes
+    '''
+    return [([_ray(square, row_step, col_step) for square in range(64)], row_step * 8 + col_step > 0)
+            for row_step, col_step in directions]
+
+
+KNIGHT_ATTACKS = _step_attacks(KNIGHT_STEPS)
+KING_ATTACKS = _step_attacks(KING_STEPS)
+# squares a pawn on each square attacks, by player. p1 moves towards row 0
+PAWN_ATTACKS = {1: _step_attacks([(-1, -1), (-1, 1)]), 2: _step_attacks([(1, -1), (1, 1)])}
+STRAIGHT_RAYS = _ray_tables(STRAIGHT_DIRECTIONS)
+DIAG_RAYS = _ray_tables(DIAG_DIRECTIONS)
+
+
+def _sliding_attacks(square: int, occupied: int, ray_tables: List[Tuple[List[int], bool]]) -> int:
+    '''
+    each ray is cut off behind the first occupied square on it, which is itself attacked
+    '''
+    attacks = 0
+    for rays, is_increasing in ray_tables:
+        ray = rays[square]
+        blockers = ray & occupied
+        if blockers:
+            if is_increasing:
+                first_blocker = (blockers & -blockers).bit_length() - 1
+            else:
+                first_blocker = blockers.bit_length() - 1
+            ray ^= rays[first_blocker]
+        attacks |= ray
+    return attacks
+
+
+def rook_attacks(square: int, occupied: int) -> int:
+    return _sliding_attacks(square, occupied, STRAIGHT_RAYS)
+
+
+def bishop_attacks(square: int, occupied: int) -> int:
+    return _sliding_attacks(square, occupied, DIAG_RAYS)
+
+
+def queen_attacks(square: int, occupied: int) -> int:
+    return _sliding_attacks(square, occupied, STRAIGHT_RAYS) | _sliding_attacks(square, occupied, DIAG_RAYS)
@@ -1,6 +1,13 @@
 from engine.input.coordinate_parser import CoordinateParser
 from engine.map.components.coordinate import Coordinate
 
+# castling rights bitmask
+P1_KINGSIDE = 1
+P1_QUEENSIDE = 2
+P2_KINGSIDE = 4
+P2_QUEENSIDE = 8
+ALL_CASTLING_RIGHTS = P1_KINGSIDE | P1_QUEENSIDE | P2_KINGSIDE | P2_QUEENSIDE
+
 
 class CastleSpec:
 
@@ -35,13 +42,36 @@ class CastleSpec:
                 self.dest_rook_coord = CoordinateParser.to_coordinate('d8')
         else:
             raise SystemError()
+        self.player = player
+        if player == 1:
+            self.castling_right = P1_KINGSIDE if is_kingside else P1_QUEENSIDE
+        else:
+            self.castling_right = P2_KINGSIDE if is_kingside else P2_QUEENSIDE
+        self.king_square = self.king_coord.index
+        self.rook_square = self.rook_coord.index
+        self.dest_king_square = self.dest_king_coord.index
+        self.dest_rook_square = self.dest_rook_coord.index
+        self.passthru_mask = 0
+        for coord in self.passthru_coords:
+            self.passthru_mask |= 1 << coord.index
+        # squares the king stands on, crosses or lands on, none of which may be attacked
+        king_step = 1 if self.dest_king_square > self.king_square else -1
+        self.king_path_squares = list(range(self.king_square, self.dest_king_square + king_step, king_step))
 
 
 SPECS = [CastleSpec(1, True), CastleSpec(1, False), CastleSpec(2, True), CastleSpec(2, False)]
+SPECS_BY_DEST_KING_SQUARE = {spec.dest_king_square: spec for spec in SPECS}
+SPECS_BY_PLAYER_AND_SIDE = {(1, True): SPECS[0], (1, False): SPECS[1], (2, True): SPECS[2], (2, False): SPECS[3]}
+
+# rights that survive a move from or to each square
+CASTLING_RIGHTS_KEPT = [ALL_CASTLING_RIGHTS] * 64
+for _spec in SPECS:
+    CASTLING_RIGHTS_KEPT[_spec.king_square] &= ~_spec.castling_right
+    CASTLING_RIGHTS_KEPT[_spec.rook_square] &= ~_spec.castling_right
 
 
 def get_castle_spec_for_king_coords(king_start_coord: Coordinate, king_dest_coord: Coordinate):
     for spec in SPECS:
-        if spec.king_coord == king_start_coord and spec.dest_king_coord == king_dest_coord:
+        if spec.king_coord is king_start_coord and spec.dest_king_coord is king_dest_coord:
             return spec
     raise SystemError()
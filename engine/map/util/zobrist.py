@@ -0,0 +1,41 @@
+import random
+from typing import Optional
+
+from engine.map.components.bitboards import Bitboards, PAWN_INDEX, yield_squares
+from engine.map.util.attack_tables import PAWN_ATTACKS
+from engine.map.util.player import Player
+
+# fixed seed so position keys are the same in every process and can be stored
+_random = random.Random(20200522)
+
+PIECE_SQUARE_KEYS = {player: [[_random.getrandbits(64) for _ in range(64)] for _ in range(6)] for player in (1, 2)}
+PLAYER_2_TO_MOVE_KEY = _random.getrandbits(64)
+CASTLING_RIGHTS_KEYS = [_random.getrandbits(64) for _ in range(16)]
+ENPASSANT_COL_KEYS = [_random.getrandbits(64) for _ in range(8)]
+
+
+def get_enpassant_key(bitboards: Bitboards, player: int, enpassant_square: Optional[int]) -> int:
+    '''
+    the en passant column only counts towards the key when the player to move has a pawn that can take
+    '''
+    if enpassant_square is None:
+        return 0
+    if PAWN_ATTACKS[Player.other(player)][enpassant_square] & bitboards.pieces[player][PAWN_INDEX]:
+        return ENPASSANT_COL_KEYS[enpassant_square & 7]
+    return 0
+
+
+def compute_key(bitboards: Bitboards, player: int, castling_rights: int, enpassant_square: Optional[int]) -> int:
+    '''
+    key for a whole position. Board keeps its key up to date move by move, this is for setting it up
+    '''
+    key = 0
+    for piece_player in (1, 2):
+        for piece_index, bitboard in enumerate(bitboards.pieces[piece_player]):
+            for square in yield_squares(bitboard):
+                key ^= PIECE_SQUARE_KEYS[piece_player][piece_index][square]
+    if player == 2:
+        key ^= PLAYER_2_TO_MOVE_KEY
+    key ^= CASTLING_RIGHTS_KEYS[castling_rights]
+    key ^= get_enpassant_key(bitboards, player, enpassant_square)
+    return key
@@ -1,8 +1,12 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 from bearlibterminal import terminal
 
 from config import Config
+from engine.input.fen_parser import FenParser
+from engine.input.invalid_notation_exception import InvalidNotationException
+
+MAX_FEN_LENGTH = 90
 
 
 class MenuOption:
@@ -12,21 +16,27 @@ class MenuOption:
 
 
 class GameStartException(Exception):
-    def __init__(self, player_options: Dict[int, MenuOption]):
+    def __init__(self, player_options: Dict[int, MenuOption], start_fen: Optional[str]):
         self.player_options = player_options
+        self.start_fen = start_fen
 
 
 class Menu:
-    def __init__(self, row, col):
+    def __init__(self, row, col, start_fen: Optional[str] = None):
         self._row = row
         self._col = col
         self._current_player = 0
         self._player_options = dict()
+        self._start_fen = start_fen
+        # text typed so far while entering a fen, None when not entering one
+        self._fen_input: Optional[str] = None
+        self._fen_error = None
         self.update_player()
 
     def loop(self):
         current_options = self._player_options[self._current_player]
         terminal.clear()
+        self._render_fen()
         terminal.puts(
             self._col, self._row - 2,
             str.format('TERMCHESS'),
@@ -52,7 +62,12 @@ class Menu:
         key = terminal.read()
         if key == terminal.TK_CLOSE:
             raise SystemExit()
-        if key == terminal.TK_ESCAPE:
+        if self._fen_input is not None:
+            self._handle_fen_input(key)
+        elif key == terminal.TK_F:
+            self._fen_input = ''
+            self._fen_error = None
+        elif key == terminal.TK_ESCAPE:
             if self._current_player == 2:
                 self._current_player = 1
                 del self._player_options[2]
@@ -77,7 +92,39 @@ class Menu:
         self._current_player += 1
         self._player_options[self._current_player] = MenuOption(is_human=True, cpu_lvl=10)
         if self._current_player > 2:
-            raise GameStartException(player_options=self._player_options)
+            raise GameStartException(player_options=self._player_options, start_fen=self._start_fen)
+
+    def _handle_fen_input(self, key):
+        if key == terminal.TK_ESCAPE:
+            self._fen_input = None
+        elif key == terminal.TK_RETURN:
+            fen = self._fen_input.strip()
+            self._fen_input = None
+            if not fen:
+                self._start_fen = None
+                return
+            try:
+                FenParser().parse(fen)
+                self._start_fen = fen
+                self._fen_error = None
+            except InvalidNotationException as e:
+                self._fen_error = str(e)
+        elif key == terminal.TK_BACKSPACE and len(self._fen_input) > 0:
+            self._fen_input = self._fen_input[:-1]
+        elif terminal.check(terminal.TK_WCHAR) and len(self._fen_input) < MAX_FEN_LENGTH:
+            self._fen_input += chr(terminal.state(terminal.TK_WCHAR))
+
+    def _render_fen(self):
+        fen_col = self._col - 24
+        if self._fen_input is not None:
+            terminal.puts(fen_col, self._row + 6, str.format('fen: {}█', self._fen_input))
+            terminal.puts(fen_col, self._row + 7, '[color=grey][[ENTER: Confirm, empty for the start position]] [[ESC: Cancel]]')
+            return
+        if self._fen_error:
+            terminal.puts(fen_col, self._row + 6, str.format('[color={}]error: {}', Config.RED_COLOR, self._fen_error))
+        elif self._start_fen:
+            terminal.puts(fen_col, self._row + 6, str.format('[color=grey]from {}', self._start_fen))
+        terminal.puts(fen_col, self._row + 7, '[color=grey][[F: Start from a FEN position]]')
 
     def _render(self, player):
         player_has_options = player in self._player_options.keys()
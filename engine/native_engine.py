@@ -0,0 +1,147 @@
+import random
+import threading
+from typing import Dict, Optional
+
+from engine.analysis import Analysis, AnalysisStoppedException, PrincipalVariation
+from engine.input.long_notation_parser import LongNotationParser
+from engine.map.components.bitboards import to_coordinate
+from engine.map.components.board import Board, BitboardMove
+from engine.map.components.piece import INDEX_TO_PIECE_TYPE
+from engine.search import Searcher, SearchResult, MATE_SCORE, MATE_THRESHOLD, MAX_DEPTH
+from engine.uci_position import UciPosition
+
+# budgets by skill level 0-20, the same levels the menu offers for stockfish
+DEPTH_BY_LVL = [1 + lvl // 3 for lvl in range(21)]
+NODES_BY_LVL = [int(300 * 1.3 ** lvl) for lvl in range(21)]
+MOVETIME_MS_BY_LVL = [50 + 75 * lvl for lvl in range(21)]
+# below the top level, pick among the best few moves within this many centipawns of the best, like stockfish
+SKILL_MULTIPV = 4
+SKILL_MARGIN_CP_BY_LVL = [10 * (20 - lvl) for lvl in range(21)]
+MAX_LVL = 20
+NAME = 'termchess native'
+
+
+class NativeEngine:
+    '''
+    The built in search behind the same interface as UciEngine, for boxes without an engine binary. Skill
+    levels map to depth, node and time budgets.
+    '''
+
+    def __init__(self, seed: Optional[int] = None):
+        self._lvl = MAX_LVL
+        self._position: Optional[UciPosition] = None
+        self._board: Optional[Board] = None
+        self._searcher = Searcher()
+        self._random = random.Random(seed)
+        self._long_notation_parser = LongNotationParser()
+        self._lock = threading.Lock()
+        # set to end the running search, see stop
+        self._stop_lock = threading.Lock()
+        self._searching_position: Optional[UciPosition] = None
+        self._stop_event = threading.Event()
+
+    def get_name(self) -> str:
+        return NAME
+
+    def set_option(self, name: str, value):
+        '''
+        only Skill Level means anything here, other uci options are ignored
+        '''
+        if name == 'Skill Level':
+            self._lvl = max(0, min(int(value), MAX_LVL))
+
+    def new_game(self):
+        with self._lock:
+            self._searcher.clear()
+            self._position = None
+
+    def analyse(self, position: UciPosition, depth: Optional[int] = None, movetime: Optional[int] = None,
+                multipv: int = 1) -> Analysis:
+        '''
+        one search of the position, within the skill level's budgets unless a depth or movetime is given
+        '''
+        with self._lock:
+            if position != self._position:
+                self._board = self._get_board(position)
+                self._position = position
+            with self._stop_lock:
+                self._searching_position = position
+                self._stop_event = threading.Event()
+                stop_event = self._stop_event
+            try:
+                result = self.search(self._board, depth=depth, movetime=movetime,
+                                     multipv=multipv if self._lvl == MAX_LVL else max(multipv, SKILL_MULTIPV),
+                                     stop_event=stop_event)
+            finally:
+                with self._stop_lock:
+                    self._searching_position = None
+            if stop_event.is_set():
+                raise AnalysisStoppedException()
+            variations = [PrincipalVariation(self._to_p1_evaluation(score),
+                                             [self._to_long_notation(move) for move in moves])
+                          for score, moves in result.variations]
+            if not variations:
+                # mated or stalemated, the way uci engines report it
+                is_mated = self._board.is_king_attacked(self._board.get_player_to_move())
+                evaluation = {'type': 'mate', 'value': 0} if is_mated else {'type': 'cp', 'value': 0}
+                return Analysis(best_move=None, evaluation=evaluation, variations=[], multipv=multipv)
+            best_move = self._to_long_notation(self._pick_move(result))
+            return Analysis(best_move=best_move, evaluation=variations[0].evaluation, variations=variations[:multipv],
+                            multipv=multipv)
+
+    def search(self, board: Board, depth: Optional[int] = None, movetime: Optional[int] = None,
+               multipv: int = 1, stop_event: Optional[threading.Event] = None) -> SearchResult:
+        if depth is not None or movetime is not None:
+            return self._searcher.search(board, max_depth=depth or MAX_DEPTH,
+                                         max_seconds=movetime / 1000 if movetime is not None else None,
+                                         multipv=multipv, stop_event=stop_event)
+        return self._searcher.search(board, max_depth=DEPTH_BY_LVL[self._lvl], max_nodes=NODES_BY_LVL[self._lvl],
+                                     max_seconds=MOVETIME_MS_BY_LVL[self._lvl] / 1000, multipv=multipv,
+                                     stop_event=stop_event)
+
+    def stop(self, position: UciPosition):
+        '''
+        end a search of this position early if it's still running, its analyse raises AnalysisStoppedException
+        '''
+        with self._stop_lock:
+            if self._searching_position is position:
+                self._stop_event.set()
+
+    def quit(self):
+        pass
+
+    def _get_board(self, position: UciPosition) -> Board:
+        if position.fen:
+            board = Board.from_fen(position.fen, long_notation_parser=self._long_notation_parser)
+        else:
+            board = Board(long_notation_parser=self._long_notation_parser)
+        captures = {1: [], 2: []}
+        for move_number, long_notation in enumerate(position.long_notations):
+            board.make_move(self._long_notation_parser.parse_to_move(board.get_player_to_move(), long_notation),
+                            captures, move_number)
+        return board
+
+    def _pick_move(self, result: SearchResult) -> BitboardMove:
+        best_score = result.variations[0][0]
+        if self._lvl == MAX_LVL or abs(best_score) >= MATE_THRESHOLD:
+            return result.variations[0][1][0]
+        candidates = [moves[0] for score, moves in result.variations
+                      if score >= best_score - SKILL_MARGIN_CP_BY_LVL[self._lvl]]
+        return self._random.choice(candidates)
+
+    def _to_long_notation(self, move: BitboardMove) -> str:
+        start_square, dest_square, promotion_index = move
+        return self._long_notation_parser.parse_to_long_notation(
+            to_coordinate(start_square), to_coordinate(dest_square),
+            INDEX_TO_PIECE_TYPE[promotion_index] if promotion_index is not None else None)
+
+    def _to_p1_evaluation(self, score: int) -> Dict:
+        # search scores are for the player to move, mates are plies from the root
+        if abs(score) >= MATE_THRESHOLD:
+            plies = MATE_SCORE - abs(score)
+            evaluation = {'type': 'mate', 'value': (plies + 1) // 2 if score > 0 else -((plies + 1) // 2)}
+        else:
+            evaluation = {'type': 'cp', 'value': score}
+        if self._board.get_player_to_move() != 1:
+            evaluation['value'] = -evaluation['value']
+        return evaluation
@@ -0,0 +1,178 @@
+import mmap
+import random
+import struct
+import threading
+from typing import List, Optional, Set
+
+from config import Config
+from debug import Debug
+from engine.input.long_notation_parser import LongNotationParser
+from engine.map.components.bitboards import yield_squares, PAWN_INDEX
+from engine.map.components.board import Board
+from engine.map.components.piece import King
+from engine.map.util.attack_tables import PAWN_ATTACKS
+from engine.map.util.castle_spec import P1_KINGSIDE, P1_QUEENSIDE, P2_KINGSIDE, P2_QUEENSIDE
+from engine.map.util.player import Player
+
+try:
+    # polyglot keys need the published random numbers, python-chess ships them
+    from chess.polyglot import POLYGLOT_RANDOM_ARRAY
+except ImportError:
+    POLYGLOT_RANDOM_ARRAY = None
+
+# http://hgm.nubati.net/book_format.html
+# entries are sorted by key: 64 bit key, 16 bit move, 16 bit weight, 32 bit learn, all big endian
+ENTRY_FORMAT = struct.Struct('>QHHI')
+KEY_FORMAT = struct.Struct('>Q')
+CASTLING_OFFSET = 768
+CASTLING_RIGHT_OFFSETS = [(P1_KINGSIDE, 0), (P1_QUEENSIDE, 1), (P2_KINGSIDE, 2), (P2_QUEENSIDE, 3)]
+ENPASSANT_OFFSET = 772
+TURN_OFFSET = 780
+PROMOTION_CHARS = ['', 'n', 'b', 'r', 'q']
+# polyglot books castle by taking your own rook
+CASTLE_LONG_NOTATIONS = {'e1h1': 'e1g1', 'e1a1': 'e1c1', 'e8h8': 'e8g8', 'e8a8': 'e8c8'}
+# weights are raised to this power per skill level: every book move alike at 0, proportional at 10, and the
+# strongest moves favoured at 20
+WEIGHT_EXPONENT_BY_LVL = [lvl / 10 for lvl in range(21)]
+
+
+class BookEntry:
+    def __init__(self, long_notation: str, weight: int):
+        self.long_notation = long_notation
+        self.weight = weight
+
+
+def get_polyglot_key(board: Board) -> int:
+    '''
+    position key as polyglot books store it, different from Board.get_position_key
+    '''
+    key = 0
+    for player in (1, 2):
+        for piece_index, bitboard in enumerate(board.get_piece_bitboards(player)):
+            # polyglot pieces alternate black and white, and count squares from a1
+            offset = 64 * (piece_index * 2 + (1 if player == 1 else 0))
+            for square in yield_squares(bitboard):
+                key ^= POLYGLOT_RANDOM_ARRAY[offset + (square ^ 56)]
+    castling_rights = board.get_castling_rights()
+    for castling_right, castling_right_offset in CASTLING_RIGHT_OFFSETS:
+        if castling_rights & castling_right:
+            key ^= POLYGLOT_RANDOM_ARRAY[CASTLING_OFFSET + castling_right_offset]
+    player = board.get_player_to_move()
+    enpassant_square = board.get_enpassant_square()
+    # only when a pawn stands ready to take, legal or not
+    if enpassant_square is not None and \
+            PAWN_ATTACKS[Player.other(player)][enpassant_square] & board.get_piece_bitboards(player)[PAWN_INDEX]:
+        key ^= POLYGLOT_RANDOM_ARRAY[ENPASSANT_OFFSET + (enpassant_square & 7)]
+    if player == 1:
+        key ^= POLYGLOT_RANDOM_ARRAY[TURN_OFFSET]
+    return key
+
+
+class OpeningBook:
+    '''
+    A polyglot .bin book, memory mapped so processes reading the same book share one copy of it, and binary
+    searched by key. Without a path, the file or python-chess for the keys, it holds no moves. Entries that
+    aren't legal on the board, from a key collision or a bad book, are skipped.
+    '''
+
+    def __init__(self, path: Optional[str]):
+        self._path = path
+        self._mmap: Optional[mmap.mmap] = None
+        self._entry_count = 0
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        self._is_opened = False
+        self._long_notation_parser = LongNotationParser()
+
+    def get_entries(self, board: Board) -> List[BookEntry]:
+        book = self._open()
+        if book is None:
+            return []
+        key = get_polyglot_key(board)
+        entries = []
+        index = self._find_first(book, key)
+        while index < self._entry_count:
+            entry_key, raw_move, weight, _ = ENTRY_FORMAT.unpack_from(book, index * ENTRY_FORMAT.size)
+            if entry_key != key:
+                break
+            if weight > 0:
+                entries.append(BookEntry(self._to_long_notation(board, raw_move), weight))
+            index += 1
+        if not entries:
+            return entries
+        legal_long_notations = self._get_legal_long_notations(board)
+        for entry in entries:
+            if entry.long_notation not in legal_long_notations:
+                Debug.log(str.format('skipping illegal book move {} in {}', entry.long_notation, board.to_fen()))
+        return [entry for entry in entries if entry.long_notation in legal_long_notations]
+
+    def get_move(self, board: Board, lvl: int) -> Optional[str]:
+        '''
+        a weighted random book move, favouring the heavier moves more at higher levels. None when out of book
+        '''
+        entries = self.get_entries(board)
+        if not entries:
+            return None
+        exponent = WEIGHT_EXPONENT_BY_LVL[max(0, min(lvl, len(WEIGHT_EXPONENT_BY_LVL) - 1))]
+        with self._lock:
+            return self._random.choices([entry.long_notation for entry in entries],
+                                        weights=[entry.weight ** exponent for entry in entries])[0]
+
+    def get_best_move(self, board: Board) -> Optional[str]:
+        entries = self.get_entries(board)
+        if not entries:
+            return None
+        return max(entries, key=lambda entry: entry.weight).long_notation
+
+    def close(self):
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+
+    def _open(self) -> Optional[mmap.mmap]:
+        with self._lock:
+            if not self._is_opened:
+                self._is_opened = True
+                if self._path and POLYGLOT_RANDOM_ARRAY is None:
+                    Debug.log(str.format('ignoring opening book {}: polyglot keys need python-chess', self._path))
+                elif self._path:
+                    try:
+                        with open(self._path, 'rb') as book_file:
+                            self._mmap = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ)
+                        self._entry_count = len(self._mmap) // ENTRY_FORMAT.size
+                    except (OSError, ValueError) as e:
+                        Debug.log(str.format('ignoring opening book {}: {}', self._path, e))
+            return self._mmap
+
+    def _find_first(self, book: mmap.mmap, key: int) -> int:
+        '''
+        index of the first entry with this key or above
+        '''
+        low, high = 0, self._entry_count
+        while low < high:
+            middle = (low + high) // 2
+            if KEY_FORMAT.unpack_from(book, middle * ENTRY_FORMAT.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _get_legal_long_notations(self, board: Board) -> Set[str]:
+        return {self._long_notation_parser.parse_to_long_notation(move.long_notation_start_coord, move.dest_coord,
+                                                                  move.promotion_piece_type)
+                for move in board.legal_moves()}
+
+    def _to_long_notation(self, board: Board, raw_move: int) -> str:
+        # to file, to rank, from file, from rank, promotion piece, 3 bits each from the low end
+        long_notation = str.format('{}{}{}{}{}', 'abcdefgh'[(raw_move >> 6) & 7], ((raw_move >> 9) & 7) + 1,
+                                   'abcdefgh'[raw_move & 7], ((raw_move >> 3) & 7) + 1,
+                                   PROMOTION_CHARS[(raw_move >> 12) & 7])
+        if long_notation in CASTLE_LONG_NOTATIONS:
+            start_square = (8 - int(long_notation[1])) * 8 + 4
+            if isinstance(board.get_piece_at_square(start_square), King):
+                return CASTLE_LONG_NOTATIONS[long_notation]
+        return long_notation
+
+
+OPENING_BOOK = OpeningBook(Config.OPENING_BOOK_PATH)
@@ -10,6 +10,8 @@ class BoardConsole:
     def __init__(self, row, col):
         self._row = row
         self._col = col
+        # (char, char color, bg color) each square last showed, so only changed squares are drawn
+        self._drawn_by_coord = dict()
 
     def render(self, board: Board):
         for tile in board.get_tiles():
@@ -17,7 +19,7 @@ class BoardConsole:
 
     def refresh(self, board: Board):
         '''
-        re-rendering the board resets any highlighted tiles
+        re-rendering the board resets any highlighted tiles, square by square
         '''
         self.render(board)
 
@@ -38,6 +40,10 @@ class BoardConsole:
             self._render(tile)
 
     def _render(self, tile: Tile):
+        drawn = (tile.char, tile.char_color, tile.bg_color)
+        if self._drawn_by_coord.get(tile.coordinate) == drawn:
+            return
+        self._drawn_by_coord[tile.coordinate] = drawn
         render_string = str.format("[font=chess][color={}][bkcolor={}]{}", tile.char_color,
                                    tile.bg_color, tile.char)
         self._render_board1(tile, render_string)
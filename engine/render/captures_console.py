@@ -13,6 +13,7 @@ class CapturesConsole():
         self.render('')
 
     def render(self, captures):
+        terminal.clear_area(0, self._row, 1000, 1)
         terminal.puts(
             self._col, self._row,
             self._render_player_captures(1, captures[1]),
@@ -1,6 +1,13 @@
 from bearlibterminal import terminal
 
 from config import Config
+from profiler import PROFILER
+
+# stage timings are laid out two to a row
+PROFILE_STAGES_PER_ROW = 2
+PROFILE_ROWS = 4
+# tablebase win or loss from p1's point of view
+TABLEBASE_OUTCOMES = {2: '1-0', -2: '0-1'}
 
 
 class TextConsole():
@@ -9,6 +16,7 @@ class TextConsole():
         self._row = row
         self._col = col
         self._detail_row = row + 7
+        self._evaluation = None
 
     def set_player(self, player):
         self._player = player
@@ -16,6 +24,12 @@ class TextConsole():
     def set_evaluation(self, evaluation):
         self._evaluation = evaluation
 
+    def clear_messages(self):
+        '''
+        clear status, input, message and error rows, leaving the boards alone
+        '''
+        terminal.clear_area(0, self._row - 1, 1000, 3)
+
     def render_notation_input(self, input):
         terminal.clear_area(0, Config.TEXT_CON_ROW, 1000, 1)
         terminal.puts(self._col + self._get_offset(), Config.TEXT_CON_ROW,
@@ -42,7 +56,12 @@ class TextConsole():
 
     def render_score(self):
         self._clear_detail()
-        if self._evaluation['type'] == 'cp':
+        if self._evaluation is None:
+            terminal.puts(
+                self._col, self._detail_row,
+                str.format('[color=gray][[...]]'),
+            )
+        elif self._evaluation['type'] == 'cp':
             evaluation = self._evaluation['value'] / 100
             if evaluation > 0:
                 prefix = '+'
@@ -58,16 +77,48 @@ class TextConsole():
                 self._col, self._detail_row,
                 str.format('[color=gray][[M{}]]', evaluation),
             )
+        elif self._evaluation['type'] == 'tablebase':
+            # cursed wins and blessed losses are draws under the fifty move rule
+            outcome = TABLEBASE_OUTCOMES.get(self._evaluation['value'], 'draw')
+            terminal.puts(
+                self._col, self._detail_row,
+                str.format('[color=gray][[TB {}]]', outcome),
+            )
+        elif self._evaluation['type'] == 'book':
+            terminal.puts(
+                self._col, self._detail_row,
+                str.format('[color=gray][[book]]'),
+            )
         terminal.refresh()
 
     def render_key_guide(self):
         self._clear_detail()
         terminal.puts(
             self._col, self._detail_row,
-            str.format('[color=gray][[ESC: Return to menu]] [[F1: Show engine score]] [[/: Show move hint]] [[.: Highlight weak pieces]]'),
+            str.format('[color=gray][[ESC: Return to menu]] [[F1: Show engine score]] [[/: Show move hint]] [[.: Highlight weak pieces]]{}',
+                       ' [[F2: Timings]]' if Config.PROFILE else ''),
         )
         terminal.refresh()
 
+    def render_profile(self):
+        '''
+        last ply's time in each stage, then the session's median and 95th percentile
+        '''
+        self.clear_profile()
+        stages = PROFILER.get_stages()[:PROFILE_STAGES_PER_ROW * PROFILE_ROWS]
+        for i, stage in enumerate(stages):
+            histogram = PROFILER.get_histogram(stage)
+            terminal.puts(
+                self._col + (i % PROFILE_STAGES_PER_ROW) * 48, self._row + 2 + i // PROFILE_STAGES_PER_ROW,
+                str.format('[color=gray]{:<8} {:>8.2f} ms  p50 {:>7.2f}  p95 {:>7.2f}', stage,
+                           PROFILER.get_last_ply_seconds(stage) * 1e3, histogram.get_percentile(.5) * 1e3,
+                           histogram.get_percentile(.95) * 1e3),
+            )
+        terminal.refresh()
+
+    def clear_profile(self):
+        terminal.clear_area(0, self._row + 2, 1000, PROFILE_ROWS)
+
     def _clear_detail(self):
         terminal.clear_area(0, self._detail_row, 1000, 1)
 
@@ -0,0 +1,305 @@
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from engine.evaluation import evaluate, PIECE_VALUES
+from engine.map.components.bitboards import PAWN_INDEX
+from engine.map.components.board import Board, BitboardMove
+from engine.map.components.piece import NON, PIECE_TYPE_TO_INDEX
+
+INFINITY = 1000000
+MATE_SCORE = 100000
+# scores beyond this are mates, counted in plies from the root
+MATE_THRESHOLD = MATE_SCORE - 1000
+MAX_DEPTH = 64
+# transposition table flags: the stored score is exact, or only bounds the true score
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+TRANSPOSITION_TABLE_SIZE = 500000
+KILLERS_PER_PLY = 2
+# budgets are checked every this many nodes
+CHECK_EVERY_NODES = 1024
+
+# move ordering: transposition table move, then captures most valuable victim first and least valuable
+# attacker first within a victim, then promotions, then killer moves
+TT_MOVE_ORDER = 3000000
+CAPTURE_ORDER = 2000000
+PROMOTION_ORDER = 1000000
+KILLER_ORDER = 900000
+
+
+class SearchAbortedException(Exception):
+    pass
+
+
+class TranspositionEntry:
+    __slots__ = ('depth', 'flag', 'score', 'move')
+
+    def __init__(self, depth: int, flag: int, score: int, move: Optional[BitboardMove]):
+        self.depth = depth
+        self.flag = flag
+        self.score = score
+        self.move = move
+
+
+class SearchResult:
+    '''
+    Best root moves after the deepest completed iteration, scored for the player to move. Each variation starts
+    with its root move.
+    '''
+
+    def __init__(self, variations: List[Tuple[int, List[BitboardMove]]], depth: int, nodes: int, seconds: float):
+        self.variations = variations
+        self.depth = depth
+        self.nodes = nodes
+        self.seconds = seconds
+
+
+class Searcher:
+    '''
+    Iterative deepening alpha-beta over a Board with a quiescence search, a transposition table kept between
+    searches and killer moves. Stops at a depth, node or time budget, whichever comes first.
+    '''
+
+    def __init__(self):
+        self._transposition_table: Dict[int, TranspositionEntry] = dict()
+        self._killers: List[List[BitboardMove]] = [[] for _ in range(MAX_DEPTH + 1)]
+        self._nodes = 0
+        self._max_nodes = None
+        self._deadline = None
+        self._can_abort = False
+        self._stop_event: Optional[threading.Event] = None
+
+    def clear(self):
+        self._transposition_table = dict()
+
+    def search(self, board: Board, max_depth: int, max_nodes: Optional[int] = None,
+               max_seconds: Optional[float] = None, multipv: int = 1,
+               stop_event: Optional[threading.Event] = None) -> SearchResult:
+        '''
+        search to max_depth unless a budget runs out first. depth 1 always completes, unless stop_event is set
+        '''
+        start_time = time.perf_counter()
+        self._nodes = 0
+        self._max_nodes = max_nodes
+        self._deadline = start_time + max_seconds if max_seconds is not None else None
+        self._stop_event = stop_event
+        self._killers = [[] for _ in range(MAX_DEPTH + 1)]
+        if len(self._transposition_table) > TRANSPOSITION_TABLE_SIZE:
+            self._transposition_table = dict()
+
+        root_moves = self._get_legal_moves(board)
+        variations = []
+        depth_reached = 0
+        for depth in range(1, min(max_depth, MAX_DEPTH) + 1):
+            # a half finished iteration can't be trusted, the previous one stands
+            self._can_abort = depth > 1
+            try:
+                scored_moves = self._search_root(board, root_moves, depth, min(multipv, len(root_moves)))
+            except SearchAbortedException:
+                break
+            depth_reached = depth
+            variations = [(score, self._get_principal_variation(board, move, depth)) for score, move in scored_moves]
+            # search the best moves first next iteration
+            best_moves = [move for _, move in scored_moves]
+            root_moves = best_moves + [move for move in root_moves if move not in best_moves]
+            if scored_moves and abs(scored_moves[0][0]) >= MATE_THRESHOLD:
+                break
+        return SearchResult(variations, depth_reached, self._nodes, time.perf_counter() - start_time)
+
+    def _search_root(self, board: Board, root_moves: List[BitboardMove], depth: int,
+                     multipv: int) -> List[Tuple[int, BitboardMove]]:
+        '''
+        best move and its exact score, then the best of the rest and so on for each variation asked for
+        '''
+        scored_moves = []
+        excluded_moves: Set[BitboardMove] = set()
+        for _ in range(multipv):
+            alpha = -INFINITY
+            best_move = None
+            for move in root_moves:
+                if move in excluded_moves:
+                    continue
+                board.push(move)
+                try:
+                    score = -self._negamax(board, depth - 1, -INFINITY, -alpha, 1)
+                finally:
+                    board.pop()
+                if best_move is None or score > alpha:
+                    alpha = score
+                    best_move = move
+            scored_moves.append((alpha, best_move))
+            excluded_moves.add(best_move)
+        if multipv == 1 and scored_moves:
+            self._store(board.get_position_key(), depth, EXACT, scored_moves[0][0], scored_moves[0][1], 0)
+        return scored_moves
+
+    def _negamax(self, board: Board, depth: int, alpha: int, beta: int, ply: int) -> int:
+        self._count_node()
+        key = board.get_position_key()
+        entry = self._transposition_table.get(key)
+        tt_move = None
+        if entry is not None:
+            tt_move = entry.move
+            if entry.depth >= depth:
+                score = self._from_tt_score(entry.score, ply)
+                if entry.flag == EXACT or (entry.flag == LOWER_BOUND and score >= beta) or \
+                        (entry.flag == UPPER_BOUND and score <= alpha):
+                    return score
+        if depth <= 0 or ply >= MAX_DEPTH:
+            return self._quiesce(board, alpha, beta, ply)
+
+        player = board.get_player_to_move()
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = None
+        killers = self._killers[ply]
+        for move in self._order_moves(board, board.get_pseudo_legal_moves(), tt_move, killers):
+            board.push(move)
+            try:
+                if board.is_king_attacked(player):
+                    continue
+                score = -self._negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                board.pop()
+            if score > best_score:
+                best_score = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if not self._is_capture(board, move) and move not in killers:
+                    killers.insert(0, move)
+                    del killers[KILLERS_PER_PLY:]
+                break
+
+        if best_move is None:
+            # no legal move: mated, sooner is worse, or stalemate
+            return -MATE_SCORE + ply if board.is_king_attacked(player) else 0
+        if best_score <= original_alpha:
+            flag = UPPER_BOUND
+        elif best_score >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self._store(key, depth, flag, best_score, best_move, ply)
+        return best_score
+
+    def _quiesce(self, board: Board, alpha: int, beta: int, ply: int) -> int:
+        '''
+        only captures and promotions until the position is quiet, so a search never stops mid exchange
+        '''
+        self._count_node()
+        stand_pat = evaluate(board)
+        if stand_pat >= beta or ply >= MAX_DEPTH:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+        player = board.get_player_to_move()
+        tactical_moves = [move for move in board.get_pseudo_legal_moves()
+                          if move[2] is not None or self._is_capture(board, move)]
+        for move in self._order_moves(board, tactical_moves, None, []):
+            board.push(move)
+            try:
+                if board.is_king_attacked(player):
+                    continue
+                score = -self._quiesce(board, -beta, -alpha, ply + 1)
+            finally:
+                board.pop()
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+        return alpha
+
+    def _order_moves(self, board: Board, moves: List[BitboardMove], tt_move: Optional[BitboardMove],
+                     killers: List[BitboardMove]) -> List[BitboardMove]:
+        def get_order(move):
+            if move == tt_move:
+                return TT_MOVE_ORDER
+            start_square, dest_square, promotion_index = move
+            attacker_index = PIECE_TYPE_TO_INDEX[type(board.get_piece_at_square(start_square))]
+            victim = board.get_piece_at_square(dest_square)
+            if victim is not NON:
+                return CAPTURE_ORDER + PIECE_VALUES[PIECE_TYPE_TO_INDEX[type(victim)]] * 10 - attacker_index
+            if attacker_index == PAWN_INDEX and (start_square - dest_square) & 7:
+                # en passant
+                return CAPTURE_ORDER + PIECE_VALUES[PAWN_INDEX] * 10 - attacker_index
+            if promotion_index is not None:
+                return PROMOTION_ORDER + promotion_index
+            if move in killers:
+                return KILLER_ORDER - killers.index(move)
+            return 0
+
+        return sorted(moves, key=get_order, reverse=True)
+
+    def _is_capture(self, board: Board, move: BitboardMove) -> bool:
+        start_square, dest_square, _ = move
+        if board.get_piece_at_square(dest_square) is not NON:
+            return True
+        # a pawn changing file onto an empty square takes en passant
+        return PIECE_TYPE_TO_INDEX[type(board.get_piece_at_square(start_square))] == PAWN_INDEX and \
+            (start_square - dest_square) & 7 != 0
+
+    def _get_legal_moves(self, board: Board) -> List[BitboardMove]:
+        player = board.get_player_to_move()
+        legal_moves = []
+        for move in board.get_pseudo_legal_moves():
+            board.push(move)
+            if not board.is_king_attacked(player):
+                legal_moves.append(move)
+            board.pop()
+        return legal_moves
+
+    def _get_principal_variation(self, board: Board, root_move: BitboardMove, depth: int) -> List[BitboardMove]:
+        '''
+        follow the best moves in the transposition table from the root move
+        '''
+        variation = [root_move]
+        board.push(root_move)
+        seen_keys = {board.get_position_key()}
+        while len(variation) < depth:
+            entry = self._transposition_table.get(board.get_position_key())
+            if entry is None or entry.move is None or entry.move not in self._get_legal_moves(board):
+                break
+            board.push(entry.move)
+            variation.append(entry.move)
+            if board.get_position_key() in seen_keys:
+                break
+            seen_keys.add(board.get_position_key())
+        for _ in variation:
+            board.pop()
+        return variation
+
+    def _store(self, key: int, depth: int, flag: int, score: int, move: Optional[BitboardMove], ply: int):
+        entry = self._transposition_table.get(key)
+        if entry is not None and entry.depth > depth:
+            return
+        self._transposition_table[key] = TranspositionEntry(depth, flag, self._to_tt_score(score, ply), move)
+
+    def _to_tt_score(self, score: int, ply: int) -> int:
+        # mates are stored as distance from this node, so they stay right when reached by another path
+        if score >= MATE_THRESHOLD:
+            return score + ply
+        if score <= -MATE_THRESHOLD:
+            return score - ply
+        return score
+
+    def _from_tt_score(self, score: int, ply: int) -> int:
+        if score >= MATE_THRESHOLD:
+            return score - ply
+        if score <= -MATE_THRESHOLD:
+            return score + ply
+        return score
+
+    def _count_node(self):
+        self._nodes += 1
+        if self._nodes % CHECK_EVERY_NODES:
+            return
+        if self._stop_event is not None and self._stop_event.is_set():
+            raise SearchAbortedException()
+        if not self._can_abort:
+            return
+        if self._max_nodes is not None and self._nodes >= self._max_nodes:
+            raise SearchAbortedException()
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            raise SearchAbortedException()
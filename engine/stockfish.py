@@ -1,27 +1,84 @@
-# https://pypi.org/project/stockfish/
-from stockfish import Stockfish
+from typing import Dict, Optional
 
-from debug import Debug
+from config import Config
+from engine.analysis import Analysis
+from engine.engine_cache import EngineCache
+from engine.engine_pool import ENGINE_POOL
+from engine.uci_position import UciPosition
+from profiler import PROFILER
 
 MAX_LVL = 20
+ANALYSIS_ROLE = 'analysis'
+
+# shared by every game in the process: full strength analysis only depends on the position and the engine
+ANALYSIS_CACHE = EngineCache(max_entries=Config.ENGINE_CACHE_SIZE, path=Config.ENGINE_CACHE_PATH)
+
+
+def get_player_role(player: int) -> str:
+    return str.format('p{}', player)
 
 
 class StockfishWrapper:
-    def __init__(self):
-        self._stockfish = Stockfish("./stockfish")
-        Debug.log(self._stockfish.get_parameters())
+    '''
+    Pooled engines for one game: a full strength one for analysis and one per cpu player at that player's level.
+    '''
+
+    def __init__(self, lvl_by_player: Dict[int, int]):
+        self._lvl_by_player = dict(lvl_by_player)
+        self._analysis_engine = ENGINE_POOL.acquire(ANALYSIS_ROLE, MAX_LVL)
+        self._engine_by_player = {player: ENGINE_POOL.acquire(get_player_role(player), lvl)
+                                  for player, lvl in self._lvl_by_player.items()}
+        self._engine_by_role = {get_player_role(player): engine for player, engine in self._engine_by_player.items()}
+        self._engine_by_role[ANALYSIS_ROLE] = self._analysis_engine
+
+    def close(self):
+        '''
+        hand the engines back to the pool for the next game
+        '''
+        ENGINE_POOL.release(ANALYSIS_ROLE, self._analysis_engine)
+        for player, engine in self._engine_by_player.items():
+            ENGINE_POOL.release(get_player_role(player), engine)
+
+    def analyse(self, position: UciPosition, position_key: int, depth: Optional[int] = None,
+                movetime: Optional[int] = None, multipv: int = 1) -> Analysis:
+        '''
+        score, best move and top variations at full strength from a single search
+        '''
+        cache_field = self._get_cache_field(self._analysis_engine)
+        analysis = self._get_cached_analysis(position_key, cache_field, multipv)
+        if analysis is None:
+            with PROFILER.span('engine'):
+                analysis = self._analysis_engine.analyse(position, depth=depth, movetime=movetime, multipv=multipv)
+            ANALYSIS_CACHE.put(position_key, cache_field, analysis.to_dict())
+        return analysis
 
-    def set_position(self, long_notations):
-        self._stockfish.set_position(long_notations)
+    def get_move_for_player(self, position: UciPosition, position_key: int, player: int) -> Optional[str]:
+        is_max_lvl = self._lvl_by_player[player] == MAX_LVL
+        engine = self._engine_by_player[player]
+        cache_field = self._get_cache_field(engine)
+        # weaker levels pick randomly among good moves, so caching them would make the cpu predictable
+        if is_max_lvl:
+            analysis = self._get_cached_analysis(position_key, cache_field, multipv=1)
+            if analysis is not None:
+                return analysis.best_move
+        with PROFILER.span('engine'):
+            analysis = engine.analyse(position)
+        if is_max_lvl:
+            ANALYSIS_CACHE.put(position_key, cache_field, analysis.to_dict())
+        return analysis.best_move
 
-    def get_evaluation(self):
-        self._stockfish.set_skill_level(MAX_LVL)
-        return self._stockfish.get_evaluation()
+    def stop(self, role: str, position: UciPosition):
+        '''
+        stop a search of this position still running on the role's engine
+        '''
+        self._engine_by_role[role].stop(position)
 
-    def get_best_move(self):
-        self._stockfish.set_skill_level(MAX_LVL)
-        return self._stockfish.get_best_move()
+    def _get_cached_analysis(self, position_key: int, cache_field: str, multipv: int) -> Optional[Analysis]:
+        analysis_dict = ANALYSIS_CACHE.get(position_key, cache_field)
+        if analysis_dict is None or analysis_dict['multipv'] < multipv:
+            return None
+        return Analysis.from_dict(analysis_dict)
 
-    def get_move_at_lvl(self, lvl: int):
-        self._stockfish.set_skill_level(lvl)
-        return self._stockfish.get_best_move()
+    def _get_cache_field(self, engine) -> str:
+        # analysis from one engine mustn't be served as another's
+        return str.format('analysis {}', engine.get_name())
@@ -0,0 +1,62 @@
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, List, Tuple
+
+from config import Config
+from engine.stockfish import StockfishWrapper, ANALYSIS_ROLE, get_player_role
+from engine.uci_position import UciPosition
+
+
+class StockfishWorker:
+    '''
+    Runs engine queries on background threads and hands back futures, so the terminal loop keeps reading input
+    while stockfish thinks. Each role (analysis, or a cpu player) has its own engine and its own thread, so a cpu
+    move never queues behind analysis. Every query carries its own position, so queued queries for an old
+    position can be cancelled without confusing the engine.
+    '''
+
+    def __init__(self, stockfish: StockfishWrapper):
+        self._stockfish = stockfish
+        # one thread per engine, started on its first query
+        self._executor_by_role: Dict[str, ThreadPoolExecutor] = dict()
+        # (future, role, position) of each query that may still be queued or running
+        self._pending: List[Tuple[Future, str, UciPosition]] = []
+
+    def get_analysis(self, position: UciPosition, position_key: int) -> Future:
+        '''
+        future of the full strength analysis
+        '''
+        return self._submit(ANALYSIS_ROLE, position, self._analyse, position, position_key)
+
+    def get_move_for_player(self, position: UciPosition, position_key: int, player: int) -> Future:
+        return self._submit(get_player_role(player), position, self._stockfish.get_move_for_player, position,
+                            position_key, player)
+
+    def cancel_pending(self):
+        '''
+        cancel queries that haven't started and stop the ones running, so their engines are free for the next
+        position. a stopped query's future raises AnalysisStoppedException
+        '''
+        for future, role, position in self._pending:
+            if not future.done() and not future.cancel():
+                self._stockfish.stop(role, position)
+        self._pending = []
+
+    def shutdown(self):
+        self.cancel_pending()
+        for executor in self._executor_by_role.values():
+            executor.shutdown(wait=False)
+        # a query still running ends soon after its stop, engines serialize their queries
+        self._stockfish.close()
+
+    def _submit(self, role: str, position: UciPosition, fn, *args) -> Future:
+        self._pending = [pending for pending in self._pending if not pending[0].done()]
+        executor = self._executor_by_role.get(role)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='stockfish-' + role)
+            self._executor_by_role[role] = executor
+        future = executor.submit(fn, *args)
+        self._pending.append((future, role, position))
+        return future
+
+    def _analyse(self, position, position_key):
+        return self._stockfish.analyse(position, position_key, multipv=Config.ANALYSIS_MULTIPV)
@@ -0,0 +1,123 @@
+import threading
+from typing import Dict, Optional
+
+from config import Config
+from debug import Debug
+from engine.map.components.board import Board
+
+try:
+    # python-chess reads syzygy tables through memory maps
+    import chess
+    import chess.syzygy
+except ImportError:
+    chess = None
+
+# win, cursed win (a win the fifty move rule turns into a draw), draw, blessed loss, loss
+WIN = 2
+LOSS = -2
+# ranks a move below every real win, and a mate in one above them
+MATE_IN_ONE_ORDER = -1
+
+
+class TablebaseResult:
+    '''
+    Exact outcome of a position from its syzygy tables. wdl is for the player to move, evaluation for p1 like
+    engine analysis. best_move keeps a win a win under the fifty move rule and delays a loss as long as it can.
+    '''
+
+    def __init__(self, wdl: int, evaluation: Dict, best_move: Optional[str]):
+        self.wdl = wdl
+        self.evaluation = evaluation
+        self.best_move = best_move
+
+
+class Tablebase:
+    '''
+    Syzygy wdl and dtz tables from one directory, opened on first use. Positions with more pieces than the
+    largest table, or with castling rights, aren't probed. Without a path, tables or python-chess, it knows
+    nothing and callers ask the engine.
+    '''
+
+    def __init__(self, path: Optional[str]):
+        self._path = path
+        self._tablebase = None
+        self._max_pieces = 0
+        self._lock = threading.Lock()
+        self._is_opened = False
+
+    def probe(self, board: Board) -> Optional[TablebaseResult]:
+        '''
+        None when the position isn't in the tables
+        '''
+        if board.get_piece_count() > self._get_max_pieces():
+            return None
+        chess_board = chess.Board(board.to_fen())
+        if chess_board.castling_rights:
+            return None
+        with self._lock:
+            try:
+                wdl = self._tablebase.probe_wdl(chess_board)
+                best_move = self._get_best_move(chess_board)
+            except KeyError as e:
+                # a table of the right size can still be missing from the directory
+                Debug.log(str.format('tablebase probe failed: {}', e))
+                return None
+        if best_move is None:
+            # mate and stalemate are the board's to call
+            return None
+        p1_wdl = wdl if chess_board.turn == chess.WHITE else -wdl
+        return TablebaseResult(wdl, {'type': 'tablebase', 'value': p1_wdl}, best_move)
+
+    def close(self):
+        with self._lock:
+            if self._tablebase is not None:
+                self._tablebase.close()
+                self._tablebase = None
+                self._max_pieces = 0
+
+    def _get_max_pieces(self) -> int:
+        with self._lock:
+            if not self._is_opened:
+                self._is_opened = True
+                if self._path and chess is None:
+                    Debug.log(str.format('ignoring tablebase {}: probing needs python-chess', self._path))
+                elif self._path:
+                    try:
+                        self._tablebase = chess.syzygy.open_tablebase(self._path)
+                    except OSError as e:
+                        Debug.log(str.format('ignoring tablebase {}: {}', self._path, e))
+                    else:
+                        # tables are named by their pieces, KRvK holds three
+                        self._max_pieces = max((len(name) - 1 for name in self._tablebase.wdl), default=0)
+            return self._max_pieces
+
+    def _get_best_move(self, chess_board) -> Optional[str]:
+        '''
+        the move leaving the opponent worst off: the shortest way to the next capture or pawn move in a win, the
+        longest in a loss
+        '''
+        best_order = None
+        best_move = None
+        for move in chess_board.legal_moves:
+            is_zeroing = chess_board.is_zeroing(move)
+            chess_board.push(move)
+            try:
+                if chess_board.is_checkmate():
+                    order = (LOSS, MATE_IN_ONE_ORDER)
+                else:
+                    opponent_wdl = self._tablebase.probe_wdl(chess_board)
+                    opponent_dtz = self._tablebase.probe_dtz(chess_board)
+                    if opponent_wdl == LOSS:
+                        # a capture or pawn move starts the fifty move count over
+                        order = (LOSS, 0 if is_zeroing else abs(opponent_dtz))
+                    else:
+                        order = (opponent_wdl, -abs(opponent_dtz))
+            finally:
+                chess_board.pop()
+            if best_order is None or order < best_order:
+                best_order = order
+                best_move = move
+        return best_move.uci() if best_move is not None else None
+
+
+TABLEBASE = Tablebase(Config.SYZYGY_PATH)
@@ -0,0 +1,164 @@
+import math
+import multiprocessing
+import time
+from collections import namedtuple
+from itertools import combinations
+from multiprocessing.util import Finalize
+from typing import Dict, Iterator, List, Tuple
+
+from engine.engine_pool import EnginePool, NATIVE_ENGINE_PATH
+from engine.headless_game import HeadlessGame, make_mover, WIN_RESULT_BY_PLAYER
+
+ROUND_ROBIN = 'round-robin'
+GAUNTLET = 'gauntlet'
+SCORE_BY_RESULT = {WIN_RESULT_BY_PLAYER[1]: 1, WIN_RESULT_BY_PLAYER[2]: 0}
+ELO_ITERATIONS = 1000
+
+GameSpec = namedtuple('GameSpec', ['game_number', 'p1_lvl', 'p2_lvl', 'seed'])
+
+# each worker process keeps its own warm engines between games
+_worker_engine_pool = None
+
+
+def get_pairings(lvls: List[str], mode: str) -> List[Tuple[str, str]]:
+    '''
+    round robin plays every pair of levels, gauntlet plays the first level against each of the others
+    '''
+    if mode == ROUND_ROBIN:
+        return list(combinations(lvls, 2))
+    elif mode == GAUNTLET:
+        return [(lvls[0], lvl) for lvl in lvls[1:]]
+    raise ValueError(mode + ' is not a tournament mode')
+
+
+def get_game_specs(pairings: List[Tuple[str, str]], games_per_pairing: int, seed: int) -> Iterator[GameSpec]:
+    game_number = 0
+    for lvl_a, lvl_b in pairings:
+        for pairing_game in range(games_per_pairing):
+            # alternate colors within each pairing
+            p1_lvl, p2_lvl = (lvl_a, lvl_b) if pairing_game % 2 == 0 else (lvl_b, lvl_a)
+            game_number += 1
+            yield GameSpec(game_number, p1_lvl, p2_lvl, seed + game_number)
+
+
+def _init_worker(engine_path: str, depth: int):
+    global _worker_engine_pool
+    _worker_engine_pool = EnginePool(path=engine_path, depth=depth, is_native=engine_path == NATIVE_ENGINE_PATH)
+    # pool workers skip atexit, finalizers still run when the worker exits
+    Finalize(None, _worker_engine_pool.close, exitpriority=10)
+
+
+def _play_game(game_spec: GameSpec, max_plies: int) -> Dict:
+    mover_by_player = {1: make_mover(_worker_engine_pool, 1, game_spec.p1_lvl, game_spec.seed * 2),
+                       2: make_mover(_worker_engine_pool, 2, game_spec.p2_lvl, game_spec.seed * 2 + 1)}
+    start_time = time.perf_counter()
+    try:
+        game_record = HeadlessGame(mover_by_player, max_plies=max_plies).play()
+    finally:
+        for mover in mover_by_player.values():
+            mover.close()
+    record = game_record.to_dict()
+    record.update({'game': game_spec.game_number, 'p1': game_spec.p1_lvl, 'p2': game_spec.p2_lvl,
+                   'seconds': round(time.perf_counter() - start_time, 3)})
+    return record
+
+
+class Tournament:
+    '''
+    Plays engine levels against each other across worker processes, one set of engines per worker.
+    '''
+
+    def __init__(self, lvls: List[str], mode: str, games_per_pairing: int, engine_path: str, depth: int,
+                 max_plies: int, workers: int, seed: int = 0):
+        self._lvls = lvls
+        self._game_specs = list(get_game_specs(get_pairings(lvls, mode), games_per_pairing, seed))
+        self._engine_path = engine_path
+        self._depth = depth
+        self._max_plies = max_plies
+        self._workers = workers
+
+    def play(self) -> Iterator[Dict]:
+        '''
+        yield game records as games finish, in any order
+        '''
+        with multiprocessing.Pool(processes=self._workers, initializer=_init_worker,
+                                  initargs=(self._engine_path, self._depth)) as pool:
+            for record in pool.imap_unordered(_PlayGame(self._max_plies), self._game_specs):
+                yield record
+            # let workers exit on their own so they quit their engines
+            pool.close()
+            pool.join()
+
+
+class _PlayGame:
+    '''
+    picklable stand in for a lambda over the ply limit
+    '''
+
+    def __init__(self, max_plies: int):
+        self._max_plies = max_plies
+
+    def __call__(self, game_spec: GameSpec) -> Dict:
+        return _play_game(game_spec, self._max_plies)
+
+
+class Crosstable:
+    '''
+    Scores between levels from game records. Unfinished games count as draws.
+    '''
+
+    def __init__(self, lvls: List[str]):
+        self._lvls = lvls
+        # (level, opponent level) -> [score, games]
+        self._score_by_pairing: Dict[Tuple[str, str], List[float]] = dict()
+
+    def add(self, record: Dict):
+        p1_score = SCORE_BY_RESULT.get(record['result'], .5)
+        for lvl, opponent_lvl, score in ((record['p1'], record['p2'], p1_score),
+                                         (record['p2'], record['p1'], 1 - p1_score)):
+            pairing_score = self._score_by_pairing.setdefault((lvl, opponent_lvl), [0, 0])
+            pairing_score[0] += score
+            pairing_score[1] += 1
+
+    def get_elo_by_lvl(self) -> Dict[str, float]:
+        '''
+        maximum likelihood (bradley-terry) ratings, centered on 0. each pairing gets one extra virtual draw so
+        levels that won or lost every game still get a finite rating
+        '''
+        strength_by_lvl = {lvl: 1.0 for lvl in self._lvls}
+        for _ in range(ELO_ITERATIONS):
+            new_strength_by_lvl = dict()
+            for lvl in self._lvls:
+                score = 0
+                weighted_games = 0
+                for opponent_lvl in self._lvls:
+                    pairing_score = self._score_by_pairing.get((lvl, opponent_lvl))
+                    if pairing_score is None:
+                        continue
+                    score += pairing_score[0] + .5
+                    weighted_games += (pairing_score[1] + 1) / (strength_by_lvl[lvl] + strength_by_lvl[opponent_lvl])
+                new_strength_by_lvl[lvl] = score / weighted_games if weighted_games else strength_by_lvl[lvl]
+            strength_by_lvl = new_strength_by_lvl
+        elo_by_lvl = {lvl: 400 * math.log10(strength) for lvl, strength in strength_by_lvl.items()}
+        mean_elo = sum(elo_by_lvl.values()) / len(elo_by_lvl)
+        return {lvl: elo - mean_elo for lvl, elo in elo_by_lvl.items()}
+
+    def render(self) -> str:
+        elo_by_lvl = self.get_elo_by_lvl()
+        lines = [str.format('{:>8} ', 'lvl') + ''.join(str.format('{:>9}', lvl) for lvl in self._lvls) +
+                 str.format('{:>9}{:>8}', 'score', 'elo')]
+        for lvl in sorted(self._lvls, key=lambda lvl: -elo_by_lvl[lvl]):
+            cells = []
+            total_score = 0
+            total_games = 0
+            for opponent_lvl in self._lvls:
+                pairing_score = self._score_by_pairing.get((lvl, opponent_lvl))
+                if pairing_score is None:
+                    cells.append(str.format('{:>9}', '.'))
+                    continue
+                total_score += pairing_score[0]
+                total_games += pairing_score[1]
+                cells.append(str.format('{:>9}', str.format('{:g}/{}', pairing_score[0], pairing_score[1])))
+            lines.append(str.format('{:>8} ', lvl) + ''.join(cells) +
+                         str.format('{:>9}{:>+8.0f}', str.format('{:g}/{}', total_score, total_games), elo_by_lvl[lvl]))
+        return '\n'.join(lines)
@@ -0,0 +1,175 @@
+import subprocess
+import threading
+from typing import Dict, List, Optional
+
+from debug import Debug
+from engine.analysis import Analysis, AnalysisStoppedException, PrincipalVariation
+from engine.uci_position import UciPosition
+
+
+class UciEngineException(Exception):
+    pass
+
+
+class UciEngine:
+    '''
+    A chess engine subprocess driven over the UCI protocol. Queries are serialized so engines can be shared
+    between threads.
+    '''
+
+    def __init__(self, path: str, depth: int):
+        self._path = path
+        self._depth = depth
+        self._options: Dict[str, str] = dict()
+        # what the engine was last sent, so repeat queries on a position don't resend it
+        self._position: Optional[UciPosition] = None
+        self._lock = threading.Lock()
+        # the position a go is running for, so a stop only ever ends the search it was meant for
+        self._stop_lock = threading.Lock()
+        self._searching_position: Optional[UciPosition] = None
+        self._is_stopped = False
+        try:
+            self._process = subprocess.Popen([path], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                             universal_newlines=True, bufsize=1)
+        except OSError as e:
+            raise UciEngineException(str.format('can\'t start engine {}: {}', path, e))
+        self._send('uci')
+        # the engine names itself during the handshake, fall back to the binary for one that doesn't
+        self._name = path
+        for line in self._read_until('uciok'):
+            if line.startswith('id name '):
+                self._name = line[len('id name '):]
+        self._is_ready()
+
+    def get_name(self) -> str:
+        return self._name
+
+    def set_option(self, name: str, value):
+        '''
+        only sends setoption when the value changes
+        '''
+        with self._lock:
+            self._set_option(name, value)
+
+    def new_game(self):
+        with self._lock:
+            self._send('ucinewgame')
+            self._position = None
+            self._is_ready()
+
+    def analyse(self, position: UciPosition, depth: Optional[int] = None, movetime: Optional[int] = None,
+                multipv: int = 1) -> Analysis:
+        '''
+        one search of the position to a depth or for movetime milliseconds, the engine's depth by default. the
+        position is sent under the same lock, so threads sharing the engine can't search each other's positions
+        '''
+        with self._lock:
+            self._set_position(position)
+            self._set_option('MultiPV', multipv)
+            if movetime is not None:
+                lines = self._go(position, str.format('movetime {}', movetime))
+            else:
+                lines = self._go(position, str.format('depth {}', depth or self._depth))
+            evaluation = dict()
+            variation_by_number: Dict[int, PrincipalVariation] = dict()
+            for line in lines[:-1]:
+                words = line.split()
+                if words[0] != 'info' or words[1] == 'string' or 'score' not in words or self._is_bound(words):
+                    continue
+                score_index = words.index('score')
+                evaluation = self._to_p1_evaluation(words[score_index + 1], int(words[score_index + 2]))
+                if 'pv' in words:
+                    number = int(words[words.index('multipv') + 1]) if 'multipv' in words else 1
+                    # later lines are from deeper iterations
+                    variation_by_number[number] = PrincipalVariation(evaluation, words[words.index('pv') + 1:])
+            variations = [variation_by_number[number] for number in sorted(variation_by_number)]
+            return Analysis(best_move=self._parse_best_move(lines[-1]),
+                            evaluation=variations[0].evaluation if variations else evaluation,
+                            variations=variations, multipv=multipv)
+
+    def stop(self, position: UciPosition):
+        '''
+        end a search of this position early if it's still running, its analyse raises AnalysisStoppedException
+        '''
+        with self._stop_lock:
+            if self._searching_position is position and not self._is_stopped:
+                self._is_stopped = True
+                self._send('stop')
+
+    def quit(self):
+        with self._lock:
+            if self._process.poll() is None:
+                self._send('quit')
+                try:
+                    self._process.wait(timeout=1)
+                except subprocess.TimeoutExpired:
+                    self._process.kill()
+
+    def _set_position(self, position: UciPosition):
+        if position != self._position:
+            self._send(position.to_command())
+            self._position = position
+
+    def _set_option(self, name: str, value):
+        if self._options.get(name) == str(value):
+            return
+        self._send(str.format('setoption name {} value {}', name, value))
+        self._options[name] = str(value)
+        self._is_ready()
+
+    def _go(self, position: UciPosition, limit: str) -> List[str]:
+        '''
+        run a search, returning its output up to and including the bestmove line
+        '''
+        with self._stop_lock:
+            self._send('go ' + limit)
+            self._searching_position = position
+            self._is_stopped = False
+        try:
+            # a stopped search still ends with bestmove, read up to it so the next query starts clean
+            lines = self._read_until('bestmove')
+        finally:
+            with self._stop_lock:
+                self._searching_position = None
+        if self._is_stopped:
+            raise AnalysisStoppedException()
+        return lines
+
+    def _is_bound(self, words: List[str]) -> bool:
+        # scores cut off by the search window aren't exact
+        return 'lowerbound' in words or 'upperbound' in words
+
+    def _to_p1_evaluation(self, score_type: str, value: int) -> Dict:
+        # engines score for the player to move
+        return {'type': score_type, 'value': value if self._position.is_p1_to_move() else -value}
+
+    def _parse_best_move(self, bestmove_line: str) -> Optional[str]:
+        words = bestmove_line.split()
+        if len(words) < 2 or words[1] == '(none)':
+            return None
+        return words[1]
+
+    def _is_ready(self):
+        self._send('isready')
+        self._read_until('readyok')
+
+    def _send(self, command: str):
+        Debug.log(str.format('uci > {}', command))
+        try:
+            self._process.stdin.write(command + '\n')
+            self._process.stdin.flush()
+        except OSError as e:
+            raise UciEngineException(str.format('engine {} stopped: {}', self._path, e))
+
+    def _read_until(self, first_word: str) -> List[str]:
+        lines = []
+        while True:
+            line = self._process.stdout.readline()
+            if not line:
+                raise UciEngineException(str.format('engine {} stopped', self._path))
+            line = line.strip()
+            if not line:
+                continue
+            lines.append(line)
+            if line.split()[0] == first_word:
+                return lines
@@ -0,0 +1,41 @@
+from typing import Optional, Tuple
+
+from config import Config
+from engine.map.components.board import Board
+
+
+class UciPosition:
+    '''
+    A position the way uci engines get it: a fen snapshot (None for the start position) and the moves since.
+    Immutable, so engine threads can hold one while the game moves on.
+    '''
+    __slots__ = ('fen', 'long_notations')
+
+    def __init__(self, fen: Optional[str] = None, long_notations: Tuple[str, ...] = ()):
+        self.fen = fen
+        self.long_notations = long_notations
+
+    def push(self, long_notation: str, board: Board) -> 'UciPosition':
+        '''
+        the position after the move just made on the board
+        '''
+        # only snapshot after an irreversible move, so the engine still sees every position that can repeat
+        if len(self.long_notations) >= Config.UCI_SNAPSHOT_PLIES and board.is_last_move_irreversible():
+            return UciPosition(fen=board.to_fen())
+        return UciPosition(fen=self.fen, long_notations=self.long_notations + (long_notation,))
+
+    def is_p1_to_move(self) -> bool:
+        is_p1_to_move_at_fen = self.fen is None or self.fen.split()[1] == 'w'
+        return is_p1_to_move_at_fen == (len(self.long_notations) % 2 == 0)
+
+    def to_command(self) -> str:
+        command = 'position startpos' if self.fen is None else 'position fen ' + self.fen
+        if self.long_notations:
+            command += ' moves ' + ' '.join(self.long_notations)
+        return command
+
+    def __eq__(self, other):
+        return isinstance(other, UciPosition) and self.fen == other.fen and self.long_notations == other.long_notations
+
+    def __hash__(self):
+        return hash((self.fen, self.long_notations))
@@ -0,0 +1,70 @@
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+
+from config import Config
+from engine.engine_pool import EnginePool, NATIVE_ENGINE_PATH, is_engine_missing
+from engine.headless_game import HeadlessGame, GameRecord, make_mover
+from engine.input.pgn_parser import PgnGame, PgnWriter
+
+
+def get_pgn_game(args, game_number: int, game_record: GameRecord) -> PgnGame:
+    tags = {'Event': 'termchess headless', 'Round': str(game_number + 1),
+            'White': str.format('lvl {}', args.p1), 'Black': str.format('lvl {}', args.p2)}
+    if args.fen:
+        tags['SetUp'] = '1'
+        tags['FEN'] = args.fen
+    return PgnGame(tags=tags, sans=game_record.sans, result=game_record.result)
+
+
+def run_games(args) -> Counter:
+    engine_pool = EnginePool(path=args.engine, depth=args.depth, is_native=args.engine == NATIVE_ENGINE_PATH)
+    out_file = open(args.out, 'w') if args.out else sys.stdout
+    pgn_writer = PgnWriter(args.pgn) if args.pgn else None
+    results = Counter()
+    try:
+        for game_number in range(args.games):
+            mover_by_player = {1: make_mover(engine_pool, 1, args.p1, args.seed + game_number * 2),
+                               2: make_mover(engine_pool, 2, args.p2, args.seed + game_number * 2 + 1)}
+            start_time = time.perf_counter()
+            game_record = HeadlessGame(mover_by_player, max_plies=args.max_plies, start_fen=args.fen).play()
+            for mover in mover_by_player.values():
+                mover.close()
+            record = game_record.to_dict()
+            record.update({'game': game_number + 1, 'p1': args.p1, 'p2': args.p2,
+                           'seconds': round(time.perf_counter() - start_time, 3)})
+            out_file.write(json.dumps(record) + '\n')
+            out_file.flush()
+            if pgn_writer:
+                pgn_writer.write(get_pgn_game(args, game_number, game_record))
+            results[game_record.result] += 1
+    finally:
+        engine_pool.close()
+        if out_file is not sys.stdout:
+            out_file.close()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='play cpu vs cpu games without a terminal, one json line per game')
+    parser.add_argument('--games', type=int, default=1, help='number of games to play')
+    parser.add_argument('--p1', default='20', help='p1 skill level 0-20, or random for a stand in engine')
+    parser.add_argument('--p2', default='20', help='p2 skill level 0-20, or random for a stand in engine')
+    parser.add_argument('--engine', default=Config.STOCKFISH_PATH,
+                        help='uci engine binary, or native for the built in search')
+    parser.add_argument('--depth', type=int, default=Config.STOCKFISH_DEPTH, help='engine search depth')
+    parser.add_argument('--max-plies', type=int, default=400, help='stop unfinished games after this many plies')
+    parser.add_argument('--fen', help='start every game from this position')
+    parser.add_argument('--seed', type=int, default=0, help='seed for random stand in engines')
+    parser.add_argument('--pgn', help='append games to this pgn file')
+    parser.add_argument('--out', help='write game records to this file instead of stdout')
+    args = parser.parse_args()
+    if (args.p1 != 'random' or args.p2 != 'random') and is_engine_missing(args.engine):
+        parser.error(str.format('no engine binary at {}, pass --engine {} for the built in search', args.engine,
+                                NATIVE_ENGINE_PATH))
+    results = run_games(args)
+    print(str.format('p1 {} vs p2 {}: {}', args.p1, args.p2,
+                     ', '.join(str.format('{} x{}', result, count) for result, count in sorted(results.items()))),
+          file=sys.stderr)
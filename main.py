@@ -1,5 +1,27 @@
+import argparse
+
+from config import Config
 from engine.engine import Engine
+from engine.input.fen_parser import FenParser
+from engine.input.invalid_notation_exception import InvalidNotationException
+from profiler import PROFILER
 
 if __name__ == '__main__':
-    engine = Engine()
+    parser = argparse.ArgumentParser(description='play chess by typing notation')
+    parser.add_argument('--fen', help='start games from this position')
+    parser.add_argument('--profile', metavar='PATH', help='time each move pipeline stage, appending json lines here')
+    parser.add_argument('--cprofile', metavar='PATH', help='dump cProfile stats for the session here')
+    args = parser.parse_args()
+    if args.fen:
+        try:
+            FenParser().parse(args.fen)
+        except InvalidNotationException as e:
+            parser.error(str.format('bad fen: {}', e))
+    if args.profile:
+        Config.PROFILE = True
+        Config.PROFILE_PATH = args.profile
+    if args.cprofile:
+        Config.CPROFILE_PATH = args.cprofile
+        PROFILER.start_cprofile()
+    engine = Engine(start_fen=args.fen)
     engine.run()
@@ -0,0 +1,149 @@
+import atexit
+import cProfile
+import json
+import threading
+import time
+from contextlib import nullcontext
+from typing import Dict, List, Optional
+
+from config import Config
+
+# stages of the move pipeline, in the order the overlay shows them
+STAGES = ['parse', 'validate', 'commit', 'san', 'check', 'tiles', 'render', 'engine']
+# bucket n holds durations under 2^n microseconds, the last one everything longer
+BUCKET_COUNT = 32
+
+NULL_SPAN = nullcontext()
+
+
+class Histogram:
+    '''
+    Durations of one stage in power of two microsecond buckets.
+    '''
+    __slots__ = ('count', 'total_seconds', 'max_seconds', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.
+        self.max_seconds = 0.
+        self.buckets = [0] * BUCKET_COUNT
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.buckets[min(int(seconds * 1e6).bit_length(), BUCKET_COUNT - 1)] += 1
+
+    def get_percentile(self, fraction: float) -> float:
+        '''
+        upper bound of the bucket holding this fraction of the samples, in seconds
+        '''
+        if not self.count:
+            return 0.
+        seen = 0
+        for bucket, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= fraction * self.count:
+                return min((1 << bucket) / 1e6, self.max_seconds)
+        return self.max_seconds
+
+    def to_dict(self) -> Dict:
+        return {'count': self.count, 'total_ms': self.total_seconds * 1e3,
+                'mean_ms': self.total_seconds * 1e3 / self.count if self.count else 0.,
+                'p50_ms': self.get_percentile(.5) * 1e3, 'p95_ms': self.get_percentile(.95) * 1e3,
+                'max_ms': self.max_seconds * 1e3, 'buckets': self.buckets}
+
+
+class _Span:
+    __slots__ = ('_profiler', '_stage', '_start_time')
+
+    def __init__(self, profiler: 'Profiler', stage: str):
+        self._profiler = profiler
+        self._stage = stage
+
+    def __enter__(self):
+        self._start_time = time.perf_counter()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._profiler.record(self._stage, time.perf_counter() - self._start_time)
+
+
+class Profiler:
+    '''
+    Span timings across the move pipeline, off unless Config.PROFILE is set. Each stage keeps a histogram for the
+    session, and each ply's stage totals go to Config.PROFILE_PATH as a json line.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histogram_by_stage: Dict[str, Histogram] = dict()
+        self._ply_seconds_by_stage: Dict[str, float] = dict()
+        self._last_ply_seconds_by_stage: Dict[str, float] = dict()
+        self._cprofile: Optional[cProfile.Profile] = None
+
+    def span(self, stage: str):
+        '''
+        with PROFILER.span('commit'): ... times the block, and costs one check when profiling is off
+        '''
+        if not Config.PROFILE:
+            return NULL_SPAN
+        return _Span(self, stage)
+
+    def record(self, stage: str, seconds: float):
+        # engine searches finish on worker threads
+        with self._lock:
+            histogram = self._histogram_by_stage.get(stage)
+            if histogram is None:
+                histogram = self._histogram_by_stage[stage] = Histogram()
+            histogram.add(seconds)
+            self._ply_seconds_by_stage[stage] = self._ply_seconds_by_stage.get(stage, 0.) + seconds
+
+    def end_ply(self, **fields):
+        '''
+        close the current ply: spans recorded since the last call are written out with these fields
+        '''
+        if not Config.PROFILE:
+            return
+        with self._lock:
+            self._last_ply_seconds_by_stage = self._ply_seconds_by_stage
+            self._ply_seconds_by_stage = dict()
+        self._write_line(dict(fields, stages_ms={stage: seconds * 1e3 for stage, seconds in
+                                                 self._last_ply_seconds_by_stage.items()}))
+
+    def get_stages(self) -> List[str]:
+        with self._lock:
+            return [stage for stage in STAGES if stage in self._histogram_by_stage] + \
+                   sorted(stage for stage in self._histogram_by_stage if stage not in STAGES)
+
+    def get_histogram(self, stage: str) -> Histogram:
+        with self._lock:
+            return self._histogram_by_stage.get(stage) or Histogram()
+
+    def get_last_ply_seconds(self, stage: str) -> float:
+        return self._last_ply_seconds_by_stage.get(stage, 0.)
+
+    def start_cprofile(self):
+        '''
+        profile every call on this thread until close, dumping pstats to Config.CPROFILE_PATH
+        '''
+        if Config.CPROFILE_PATH and self._cprofile is None:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def close(self):
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(Config.CPROFILE_PATH)
+            self._cprofile = None
+        if Config.PROFILE and self._histogram_by_stage:
+            self._write_line({'summary': {stage: self.get_histogram(stage).to_dict() for stage in self.get_stages()}})
+
+    def _write_line(self, line: Dict):
+        if not Config.PROFILE_PATH:
+            return
+        with open(Config.PROFILE_PATH, 'a') as profile_file:
+            profile_file.write(json.dumps(dict(line, time=time.time())) + '\n')
+
+
+PROFILER = Profiler()
+atexit.register(PROFILER.close)
@@ -18,6 +18,6 @@ setup(
     app=APP,
     data_files=DATA_FILES,
     setup_requires=['py2app'],
-    install_requires=['bearlibterminal', 'numpy', 'stockfish'],
+    install_requires=['bearlibterminal', 'numpy'],
     options={'py2app': OPTIONS},
 )
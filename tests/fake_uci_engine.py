@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+'''
+A scripted stand in for a uci engine binary. Every command it gets is appended to the file named by
+FAKE_UCI_LOG, and every go is answered with the lines of the file named by FAKE_UCI_SCRIPT, bestmove included.
+A script line of just wait holds the rest of the answer back until a stop comes in, like a search running on.
+'''
+import os
+import sys
+
+WAIT_LINE = 'wait'
+
+
+def read_command(log_path: str) -> str:
+    command = sys.stdin.readline()
+    if not command:
+        sys.exit()
+    command = command.strip()
+    with open(log_path, 'a') as log_file:
+        log_file.write(command + '\n')
+    return command
+
+
+def main():
+    log_path = os.environ['FAKE_UCI_LOG']
+    script_path = os.environ['FAKE_UCI_SCRIPT']
+    while True:
+        command = read_command(log_path)
+        if command == 'uci':
+            reply = ['id name fake', 'uciok']
+        elif command == 'isready':
+            reply = ['readyok']
+        elif command.startswith('go'):
+            with open(script_path) as script_file:
+                reply = [script_line.strip() for script_line in script_file if script_line.strip()]
+        elif command == 'quit':
+            return
+        else:
+            reply = []
+        for reply_line in reply:
+            if reply_line == WAIT_LINE:
+                sys.stdout.flush()
+                while read_command(log_path) != 'stop':
+                    pass
+                continue
+            sys.stdout.write(reply_line + '\n')
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+import unittest
+
+from engine.input.fen_parser import FenParser
+from engine.input.invalid_notation_exception import InvalidNotationException
+from engine.input.long_notation_parser import LongNotationParser
+from engine.map.components.board import Board
+
+
+class FenParserTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        fen = 'r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3'
+        self.assertEqual(Board.from_fen(fen, long_notation_parser=LongNotationParser()).to_fen(), fen)
+
+    def test_rejects_back_rank_pawns(self):
+        for fen in ['P3k3/8/8/8/8/8/8/4K3 w - - 0 1', '4k3/8/8/8/8/8/8/4K2p w - - 0 1',
+                    '4k2p/8/8/8/8/8/8/4K3 b - - 0 1', '4k3/8/8/8/8/8/8/P3K3 b - - 0 1']:
+            with self.assertRaises(InvalidNotationException):
+                FenParser().parse(fen)
+
+    def test_rejects_side_not_to_move_in_check(self):
+        with self.assertRaises(InvalidNotationException):
+            FenParser().parse('4k3/8/8/8/8/8/4R3/4K3 w - - 0 1')
+
+    def test_rejects_impossible_en_passant_square(self):
+        with self.assertRaises(InvalidNotationException):
+            FenParser().parse('rnbqkbnr/pppp1ppp/8/4p3/8/8/PPPPPPPP/RNBQKBNR w KQkq d6 0 2')
+
+    def test_drops_castling_rights_without_king_and_rook(self):
+        board = Board.from_fen('r3k3/8/8/8/8/8/8/4K2R w KQkq - 0 1', long_notation_parser=LongNotationParser())
+        self.assertEqual(board.to_fen(), 'r3k3/8/8/8/8/8/8/4K2R w Kq - 0 1')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import threading
+import time
+import unittest
+
+from engine.analysis import AnalysisStoppedException
+from engine.native_engine import NativeEngine
+from engine.uci_position import UciPosition
+
+
+class NativeEngineTest(unittest.TestCase):
+
+    def test_finds_mate_in_one(self):
+        analysis = NativeEngine(seed=0).analyse(UciPosition(fen='6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1'), depth=2)
+        self.assertEqual(analysis.best_move, 'a1a8')
+        self.assertEqual(analysis.evaluation, {'type': 'mate', 'value': 1})
+
+    def test_stop_ends_running_search(self):
+        engine = NativeEngine(seed=0)
+        position = UciPosition()
+        errors = []
+
+        def analyse():
+            try:
+                engine.analyse(position, depth=30)
+            except AnalysisStoppedException as e:
+                errors.append(e)
+
+        search_thread = threading.Thread(target=analyse)
+        search_thread.start()
+        time.sleep(.2)
+        engine.stop(position)
+        search_thread.join(timeout=5)
+        self.assertFalse(search_thread.is_alive())
+        self.assertEqual(len(errors), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
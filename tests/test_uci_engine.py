@@ -0,0 +1,149 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from engine.analysis import AnalysisStoppedException
+from engine.engine_pool import EnginePool
+from engine.native_engine import NativeEngine
+from engine.uci_engine import UciEngine, UciEngineException
+from engine.uci_position import UciPosition
+
+FAKE_ENGINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_uci_engine.py')
+MULTIPV_SCRIPT = [
+    'info depth 10 multipv 1 score cp 30 pv e2e4 e7e5',
+    'info depth 10 multipv 2 score cp 10 pv d2d4',
+    # cut off by the search window, so ignored
+    'info depth 11 multipv 1 score cp 90 lowerbound pv g1f3',
+    'info depth 11 multipv 2 score mate 3 upperbound pv c2c4',
+    'bestmove e2e4 ponder e7e5',
+]
+
+
+class FakeUciEngineTest(unittest.TestCase):
+    '''
+    UciEngine and EnginePool against tests/fake_uci_engine.py, which logs what it gets and replays a script
+    '''
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self._log_path = os.path.join(self._dir.name, 'log')
+        self._script_path = os.path.join(self._dir.name, 'script')
+        os.environ['FAKE_UCI_LOG'] = self._log_path
+        os.environ['FAKE_UCI_SCRIPT'] = self._script_path
+        self._set_script(MULTIPV_SCRIPT)
+        self._engines = []
+
+    def tearDown(self):
+        for engine in self._engines:
+            engine.quit()
+        self._dir.cleanup()
+
+    def test_handshake(self):
+        engine = self._start_engine()
+        self.assertEqual(self._get_commands(), ['uci', 'isready'])
+        self.assertEqual(engine.get_name(), 'fake')
+
+    def test_set_option_only_sends_changes(self):
+        engine = self._start_engine()
+        engine.set_option('Skill Level', 5)
+        engine.set_option('Skill Level', 5)
+        engine.set_option('Skill Level', 7)
+        self.assertEqual(self._get_commands('setoption'),
+                         ['setoption name Skill Level value 5', 'setoption name Skill Level value 7'])
+
+    def test_analyse_sends_position_once(self):
+        engine = self._start_engine()
+        position = UciPosition(long_notations=('e2e4',))
+        engine.analyse(position, multipv=2)
+        engine.analyse(position, multipv=2)
+        self.assertEqual(self._get_commands('position'), ['position startpos moves e2e4'])
+        self.assertEqual(self._get_commands('setoption'), ['setoption name MultiPV value 2'])
+        self.assertEqual(self._get_commands('go'), ['go depth 12', 'go depth 12'])
+
+    def test_analyse_parses_multipv_and_skips_bounds(self):
+        analysis = self._start_engine().analyse(UciPosition(), multipv=2)
+        self.assertEqual(analysis.best_move, 'e2e4')
+        self.assertEqual(analysis.evaluation, {'type': 'cp', 'value': 30})
+        self.assertEqual([(variation.evaluation, variation.long_notations) for variation in analysis.variations],
+                         [({'type': 'cp', 'value': 30}, ['e2e4', 'e7e5']),
+                          ({'type': 'cp', 'value': 10}, ['d2d4'])])
+
+    def test_analyse_scores_for_p1(self):
+        self._set_script(['info depth 5 score mate 2 pv d8h4', 'bestmove d8h4'])
+        analysis = self._start_engine().analyse(UciPosition(long_notations=('f2f3', 'e7e5', 'g2g4')))
+        self.assertEqual(analysis.evaluation, {'type': 'mate', 'value': -2})
+        self.assertEqual(analysis.variations[0].evaluation, {'type': 'mate', 'value': -2})
+
+    def test_analyse_without_move(self):
+        self._set_script(['info depth 0 score mate 0', 'bestmove (none)'])
+        analysis = self._start_engine().analyse(UciPosition(fen='7k/5Q2/6K1/8/8/8/8/8 b - - 0 1'))
+        self.assertIsNone(analysis.best_move)
+        self.assertEqual(analysis.evaluation, {'type': 'mate', 'value': 0})
+
+    def test_stop_ends_running_search(self):
+        engine = self._start_engine()
+        position = UciPosition()
+        self._set_script(['info depth 1 score cp 20 pv e2e4', 'wait', 'bestmove e2e4'])
+        errors = []
+        search_thread = threading.Thread(target=self._analyse_catching, args=(engine, position, errors))
+        search_thread.start()
+        while 'go depth 12' not in self._get_commands('go'):
+            time.sleep(.01)
+        # an equal position isn't the query that's running
+        engine.stop(UciPosition())
+        engine.stop(position)
+        search_thread.join(timeout=5)
+        self.assertFalse(search_thread.is_alive())
+        self.assertEqual(len(errors), 1)
+        self.assertIsInstance(errors[0], AnalysisStoppedException)
+        self.assertEqual(self._get_commands('stop'), ['stop'])
+        # drained to bestmove, so the next search reads its own output
+        self._set_script(MULTIPV_SCRIPT)
+        self.assertEqual(engine.analyse(UciPosition(long_notations=('e2e4',))).best_move, 'e2e4')
+
+    def test_pool_reuses_engine_by_role(self):
+        pool = EnginePool(path=FAKE_ENGINE_PATH, depth=12)
+        engine = pool.acquire('p1', 5)
+        pool.release('p1', engine)
+        self.assertIs(pool.acquire('p1', 5), engine)
+        other_engine = pool.acquire('p2', 5)
+        self.assertIsNot(other_engine, engine)
+        pool.release('p1', engine)
+        pool.release('p2', other_engine)
+        pool.close()
+        self.assertEqual(self._get_commands('setoption name Skill Level'),
+                         ['setoption name Skill Level value 5'] * 2)
+
+    def test_pool_only_falls_back_when_allowed(self):
+        missing_path = os.path.join(self._dir.name, 'missing')
+        with self.assertRaises(UciEngineException):
+            EnginePool(path=missing_path, depth=12).acquire('p1', 5)
+        self.assertIsInstance(EnginePool(path=missing_path, depth=12, can_fall_back=True).acquire('p1', 5),
+                              NativeEngine)
+        self.assertIsInstance(EnginePool(path=FAKE_ENGINE_PATH, depth=12, is_native=True).acquire('p1', 5),
+                              NativeEngine)
+
+    def _analyse_catching(self, engine: UciEngine, position: UciPosition, errors):
+        try:
+            engine.analyse(position)
+        except AnalysisStoppedException as e:
+            errors.append(e)
+
+    def _start_engine(self) -> UciEngine:
+        engine = UciEngine(FAKE_ENGINE_PATH, depth=12)
+        self._engines.append(engine)
+        return engine
+
+    def _set_script(self, lines):
+        with open(self._script_path, 'w') as script_file:
+            script_file.write('\n'.join(lines) + '\n')
+
+    def _get_commands(self, prefix: str = ''):
+        with open(self._log_path) as log_file:
+            return [line.strip() for line in log_file if line.startswith(prefix)]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import argparse
+import json
+import os
+import sys
+
+from config import Config
+from engine.engine_pool import NATIVE_ENGINE_PATH, is_engine_missing
+from engine.tournament import Tournament, Crosstable, ROUND_ROBIN, GAUNTLET
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='play engine skill levels against each other across cores')
+    parser.add_argument('--lvls', default='0,5,10,15,20',
+                        help='comma separated skill levels 0-20, random for a stand in engine')
+    parser.add_argument('--mode', choices=[ROUND_ROBIN, GAUNTLET], default=ROUND_ROBIN,
+                        help='gauntlet plays the first level against each of the others')
+    parser.add_argument('--games', type=int, default=2, help='games per pairing, colors alternate')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes')
+    parser.add_argument('--engine', default=Config.STOCKFISH_PATH,
+                        help='uci engine binary, or native for the built in search')
+    parser.add_argument('--depth', type=int, default=Config.STOCKFISH_DEPTH, help='engine search depth')
+    parser.add_argument('--max-plies', type=int, default=400, help='unfinished games count as draws after this')
+    parser.add_argument('--seed', type=int, default=0, help='seed for random stand in engines')
+    parser.add_argument('--out', help='write a json line per game to this file')
+    args = parser.parse_args()
+
+    lvls = args.lvls.split(',')
+    if any(lvl != 'random' for lvl in lvls) and is_engine_missing(args.engine):
+        parser.error(str.format('no engine binary at {}, pass --engine {} for the built in search', args.engine,
+                                NATIVE_ENGINE_PATH))
+    tournament = Tournament(lvls=lvls, mode=args.mode, games_per_pairing=args.games, engine_path=args.engine,
+                            depth=args.depth, max_plies=args.max_plies, workers=args.workers, seed=args.seed)
+    crosstable = Crosstable(lvls)
+    out_file = open(args.out, 'w') if args.out else None
+    for record in tournament.play():
+        crosstable.add(record)
+        print(str.format('game {}: {} vs {} {} ({})', record['game'], record['p1'], record['p2'], record['result'],
+                         record['reason']), file=sys.stderr)
+        if out_file:
+            out_file.write(json.dumps(record) + '\n')
+    if out_file:
+        out_file.close()
+    print(crosstable.render())